@@ -1,6 +1,25 @@
+import copy
+import functools
+import hmac
+import os
+import time
+import uuid
+from contextlib import nullcontext
+
 from flask import Flask, render_template, request, jsonify, session
 from flask import redirect
 from assistant_slots import new_slots, process_message
+import engine
+from llm_queue import get_scheduler
+import config
+import lead_export
+import llm_client
+import piece_index
+import ratelimit
+from pieces import CATALOG
+import stock_delta
+import transcript
+import vehicles
 
 app = Flask(__name__)
 app.secret_key = "autoturbo-secret-key-change-me"  # nécessaire pour session
@@ -14,16 +33,78 @@ def index():
     return render_template("index.html")
 
 
+def client_ip() -> str:
+    if config.get().trust_forwarded_for:
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.remote_addr or "-"
+
+
+LOOPBACK = {"127.0.0.1", "::1"}
+
+
+def admin_required(view):
+    """Routes /admin/* : jeton config.admin_token, sinon appel local direct (pas via proxy)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = config.get().admin_token
+        if token:
+            ok = hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+        else:
+            ok = request.remote_addr in LOOPBACK and "X-Forwarded-For" not in request.headers
+        if not ok:
+            return jsonify({"ok": False, "error": "accès admin refusé"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @app.post("/chat")
 def chat():
+    cfg = config.get()
     data = request.get_json(force=True)
     text = (data.get("text") or "").strip()
+    sid = session.setdefault("sid", uuid.uuid4().hex)
+
+    # rejets bon marché, avant tout parsing / LLM
+    mode = ratelimit.ALLOW_LLM
+    if cfg.ratelimit_enabled:
+        limiter = ratelimit.get_limiter()
+        if len(text) > cfg.chat_max_chars:
+            limiter.count("too_long")
+            return jsonify({"answer": f"Message trop long (max {cfg.chat_max_chars} caractères)."}), 413
+        mode, wait = limiter.check(sid, client_ip())
+        if mode == ratelimit.REJECT:
+            resp = jsonify({"answer": "Trop de messages, réessayez dans un instant.", "retry_after": round(wait, 1)})
+            resp.headers["Retry-After"] = str(max(1, int(wait + 0.999)))
+            return resp, 429
 
     slots = session.get("slots") or new_slots()
-    answer, slots = process_message(text, slots)
+    turn = session.get("turn", 0) + 1
+    slots_before = copy.deepcopy(slots)
+
+    # budget LLM épuisé : le tour est servi avec les questions fixes
+    no_llm = engine.deterministic() if mode == ratelimit.ALLOW_DETERMINISTIC else nullcontext()
+    with transcript.tracing() as trace, no_llm:
+        answer, slots = process_message(text, slots)
 
     # sauvegarde mémoire (slots)
     session["slots"] = slots
+    session["turn"] = turn
+
+    # journal asynchrone : aucune écriture disque ici
+    if cfg.transcripts_enabled:
+        transcript.get_logger().log({
+            "ts": time.time(),
+            "session": sid,
+            "turn": turn,
+            "text": text,
+            "slots_before": slots_before,
+            "slots": slots,
+            "answer": answer,
+            "llm": trace.llm,
+            "timings_ms": {**trace.timings, "total": trace.total_ms()},
+        })
 
     return jsonify({"answer": answer})
 
@@ -36,6 +117,64 @@ def reset():
     session["slots"] = new_slots()
     return jsonify({"ok": True})
 
+@app.get("/metrics")
+def metrics():
+    # profondeur de file / attente par classe de priorité LLM + pool HTTP par hôte Ollama
+    snap = CATALOG.snapshot()
+    return jsonify({
+        "llm_queue": get_scheduler().stats(),
+        "llm_hosts": llm_client.stats(),
+        "transcripts": transcript.get_logger().stats(),
+        "piece_index": piece_index.stats(),
+        "ratelimit": ratelimit.get_limiter().stats(),
+        "vehicles": vehicles.REGISTRY.stats(),
+        "catalog": {"version": snap.version, "rows": len(snap.rows)},
+    })
+
+@app.get("/reports/leads")
+@admin_required
+def leads_report():
+    # lit les agrégats précalculés (pas de scan de l'historique)
+    return jsonify(lead_export.report(request.args.get("day")))
+
+@app.get("/admin/config")
+@admin_required
+def admin_config():
+    # config effective (après fichier + env + derniers SIGHUP)
+    return jsonify(config.snapshot())
+
+@app.post("/admin/config/reload")
+@admin_required
+def admin_config_reload():
+    try:
+        config.reload()
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, **config.snapshot()})
+
+@app.post("/admin/stock/delta")
+@admin_required
+def admin_stock_delta():
+    # corps : liste JSON de deltas, {"deltas": [...]} ou NDJSON (voir stock_delta.py)
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            data = list(stock_delta.parse_ndjson(request.get_data(as_text=True).splitlines()))
+        if isinstance(data, dict):
+            data = data.get("deltas", [])
+        if not isinstance(data, list) or not all(isinstance(d, dict) for d in data):
+            raise ValueError("liste de deltas attendue")
+        res = stock_delta.apply_stream(data, batch_size=max(1, len(data)))  # un seul lot atomique
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, **res})
+
 
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    cfg = config.get()  # validée au démarrage : une config invalide arrête ici
+    config.install_sighup()
+    # en debug, le reloader lance un 2e processus : exporteur seulement dans celui qui sert
+    if not cfg.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        lead_export.start_background()
+    engine.start_warmup()  # catalogue + pool HTTP en fond, le serveur écoute tout de suite
+    app.run(host=cfg.host, port=cfg.port, debug=cfg.debug)
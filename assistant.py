@@ -1,11 +1,8 @@
 # assistant.py
-import re
 from typing import Optional, Dict, Any
 
-import ollama
-from pieces import rechercher_piece
-
-MODEL = "deepseek-r1:7b"
+from engine import ask, build_fiche_stock, normalize_text, parse_slots, rechercher_piece
+import config
 
 SYSTEM = """
 Tu es un vendeur professionnel de pièces auto.
@@ -17,64 +14,9 @@ Règles:
 Réponses en français, ton poli et direct.
 """
 
-KNOWN_BRANDS = [
-    "Renault", "Volkswagen", "Peugeot", "Dacia",
-    "Toyota", "Ford", "Hyundai", "Kia", "BMW", "Mercedes"
-]
-
-KNOWN_MODELS = [
-    "Clio 4", "Golf 6", "208", "Logan", "Sandero"
-]
-
 State = Dict[str, Optional[Any]]
 
 
-# ---------- NORMALISATION ----------
-
-def normalize_text(text: str) -> str:
-    text = text.strip()
-    text = text.replace(",", " ").replace("_", " ")
-    text = re.sub(r"\s+", " ", text)
-    return text
-
-
-# ---------- EXTRACTION ----------
-
-def extract_year(text: str) -> Optional[int]:
-    m = re.search(r"\b(19\d{2}|20\d{2})\b", text)
-    return int(m.group(1)) if m else None
-
-
-def extract_brand(text: str) -> Optional[str]:
-    for brand in KNOWN_BRANDS:
-        if re.search(rf"\b{re.escape(brand)}\b", text, flags=re.IGNORECASE):
-            return brand
-    return None
-
-
-def extract_model(text: str) -> Optional[str]:
-    for model in sorted(KNOWN_MODELS, key=len, reverse=True):
-        if re.search(rf"\b{re.escape(model)}\b", text, flags=re.IGNORECASE):
-            return model
-
-    m = re.search(r"\b(clio\s*\d)\b", text, flags=re.IGNORECASE)
-    if m:
-        return m.group(1).title().replace("  ", " ")
-
-    return None
-
-
-def extract_piece(text: str) -> Optional[str]:
-    t = text.lower()
-    if "turbo" in t:
-        return "turbo"
-    if "filtre" in t and ("huile" in t or "d'huile" in t):
-        return "filtre huile"
-    if "plaquette" in t:
-        return "plaquettes frein"
-    return None
-
-
 # ---------- MÉMOIRE ----------
 
 def new_state() -> State:
@@ -82,19 +24,11 @@ def new_state() -> State:
 
 
 def update_state(state: State, text: str) -> None:
-    p = extract_piece(text)
-    b = extract_brand(text)
-    m = extract_model(text)
-    y = extract_year(text)
-
-    if p is not None:
-        state["piece"] = p
-    if b is not None:
-        state["marque"] = b
-    if m is not None:
-        state["modele"] = m
-    if y is not None:
-        state["annee"] = y
+    # même parseur que assistant_slots (plaque / VIN retirés, génération du modèle gardée)
+    found = parse_slots(text)
+    for k in ("piece", "marque", "modele", "annee"):
+        if found.get(k) is not None:
+            state[k] = found[k]
 
 
 def missing_fields(state: State) -> list[str]:
@@ -125,38 +59,11 @@ def llm_reply(user_text: str, fiche_stock: Optional[str] = None) -> str:
         messages.append({"role": "system", "content": fiche_stock})
     messages.append({"role": "user", "content": user_text})
 
-    resp = ollama.chat(
-        model=MODEL,
-        messages=messages,
-        options={"temperature": 0.1, "num_predict": 240},
-    )
-
-    # dict ou objet (Message)
-    if isinstance(resp, dict):
-        msg = resp.get("message")
-        if isinstance(msg, dict):
-            content = (msg.get("content") or "").strip()
-            thinking = (msg.get("thinking") or "").strip()
-        else:
-            content, thinking = "", ""
-    else:
-        msg = getattr(resp, "message", None)
-        content = (getattr(msg, "content", "") or "").strip() if msg else ""
-        thinking = (getattr(msg, "thinking", "") or "").strip() if msg else ""
-
-    return content if content else (thinking if thinking else "Je n’ai pas pu générer une réponse.")
-
-
-def build_fiche_stock(row: dict) -> str:
-    return (
-        "FICHE_STOCK (source: stock.csv)\n"
-        f"- piece: {row['piece']}\n"
-        f"- marque: {row['marque']}\n"
-        f"- modele: {row['modele']}\n"
-        f"- annee: {row['annee']}\n"
-        f"- prix_DH: {row['prix']}\n"
-        f"- stock: {row['stock']}\n"
-        "Règle: répondre uniquement à partir de FICHE_STOCK."
+    return ask(
+        messages,
+        num_predict=config.get().llm_num_predict_long,
+        fallback="Je n’ai pas pu générer une réponse.",
+        priority="checkout",
     )
 
 
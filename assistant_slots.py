@@ -1,11 +1,13 @@
 import re
 from typing import Dict, Optional
 
-import ollama
-from pieces import rechercher_piece
+import config
+from engine import (
+    ask, extract_contact, extract_type_piece,
+    parse_slots, parse_year, rechercher_piece, resolve_piece, resolve_vehicle,
+)
 from order import save_lead
-
-MODEL = "deepseek-r1:7b"
+from transcript import stage
 
 SYSTEM = """
 Tu es AutoTurbo, assistant professionnel de magasin de pièces auto.
@@ -26,17 +28,6 @@ NO_INFO_WORDS = {
     "je sais pas", "je ne sais pas", "nn", "nop", "j ai pas", "jai pas"
 }
 
-PIECES_KNOWN = {
-    "turbo": "turbo",
-    "filtre huile": "filtre huile",
-    "filtre d'huile": "filtre huile",
-    "plaquettes": "plaquettes frein",
-    "plaquettes frein": "plaquettes frein",
-    "disques": "disques",
-}
-
-TYPE_WORDS = ["neuf", "occasion", "original", "adaptable", "avant", "arrière", "arriere"]
-
 FLOW = [
     ("motif", "Demande le motif : commande, suivi de commande, ou SAV."),
     ("immat", "Demande l’immatriculation du véhicule, ou accepte “je ne l’ai pas”."),
@@ -49,6 +40,19 @@ FLOW = [
     ("coordonnees", "Demande téléphone ou email pour rappel et suivi."),
 ]
 
+# Textes fixes (sans Ollama) si le job LLM est abandonné (file pleine / deadline)
+FIXED_QUESTIONS = {
+    "motif": "Quel est le motif : commande, suivi de commande, ou SAV ?",
+    "immat": "Quelle est l’immatriculation du véhicule ? (sinon « je ne l’ai pas »)",
+    "chassis": "Quel est le numéro de châssis (VIN) ? (sinon « je ne l’ai pas »)",
+    "piece": "Quelle pièce recherchez-vous ? (ex: turbo, filtre huile, plaquettes frein)",
+    "type_piece": "Quel type de pièce : neuf, original, occasion, avant ou arrière ?",
+    "marque": "Quelle est la marque du véhicule ?",
+    "modele": "Quel est le modèle du véhicule ?",
+    "annee": "Quelle est l’année du véhicule ?",
+    "coordonnees": "Quel téléphone ou email pour le rappel et le suivi ?",
+}
+
 def new_slots() -> Dict[str, Optional[str | int | bool]]:
     return {
         "_step": 0,
@@ -83,12 +87,11 @@ def _clean_one_sentence(s: str) -> str:
         out = out[:160].rsplit(" ", 1)[0]
     return out
 
-import time
-
-def llm_say(instruction: str, slots: dict) -> str:
+def llm_say(instruction: str, slots: dict, priority: str = "slot", fallback: Optional[str] = None) -> str:
     """
     100% Ollama si possible.
     Si Ollama ne répond pas (erreur / vide / timeout), on renvoie un message FIXE (pas Ollama).
+    L'appel passe par l'ordonnanceur (priority: checkout > slot > greeting).
     """
     ctx = {
         "step": slots.get("_step"),
@@ -110,71 +113,23 @@ def llm_say(instruction: str, slots: dict) -> str:
         f"Instruction: {instruction}"
     )
 
-    fallback_fixed = "Désolé, service IA indisponible. Réessayez dans un instant."
-
-    start = time.time()
-    timeout_sec = 6  # ✅ tu peux mettre 4..10
-
-    while True:
-        # ✅ Timeout global
-        if time.time() - start > timeout_sec:
-            return fallback_fixed
-
-        try:
-            resp = ollama.chat(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM},
-                    {"role": "user", "content": prompt},
-                ],
-                options={
-                    "temperature": 0.1,
-                    "num_predict": 60,
-                    "stop": ["Okay", "I need", "Reason", "Réflexion", "Thinking:"],
-                },
-            )
-
-            msg = resp.get("message", {}) if isinstance(resp, dict) else {}
-            content = (msg.get("content") or "").strip()
-            thinking = (msg.get("thinking") or "").strip()
-
-            out = _clean_one_sentence(content) or _clean_one_sentence(thinking)
-
-            # ✅ si vide => retente jusqu’au timeout
-            if out:
-                return out
-
-        except Exception:
-            # ✅ si erreur => retente jusqu’au timeout
-            continue
+    fallback_fixed = fallback or "Désolé, service IA indisponible. Réessayez dans un instant."
+
+    # retry (vide / erreur) jusqu'au timeout global (llm_timeout_sec, file d'attente incluse)
+    return ask(
+        [
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": prompt},
+        ],
+        num_predict=config.get().llm_num_predict_short,
+        fallback=fallback_fixed,
+        priority=priority,
+        clean=_clean_one_sentence,
+        stop=["Okay", "I need", "Reason", "Réflexion", "Thinking:"],
+    )
 
 
 # ---------- Extract / update ----------
-def extract_year(text: str) -> Optional[int]:
-    m = re.search(r"\b(19\d{2}|20\d{2})\b", text)
-    if not m:
-        return None
-    y = int(m.group(1))
-    return y if 1980 <= y <= 2030 else None
-
-def extract_piece(text: str) -> Optional[str]:
-    t = text.lower()
-    for k, v in PIECES_KNOWN.items():
-        if k in t:
-            return v
-    return None
-
-def extract_type_piece(text: str) -> Optional[str]:
-    t = text.lower()
-    return text.strip() if any(w in t for w in TYPE_WORDS) else None
-
-def extract_contact(text: str) -> Optional[str]:
-    tel = re.search(r"\b0\d{9}\b", text)
-    email = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", text)
-    if tel or email:
-        return text.strip()
-    return None
-
 def next_key(slots: dict) -> Optional[str]:
     step = int(slots.get("_step", 0) or 0)
     if step < 0:
@@ -183,67 +138,98 @@ def next_key(slots: dict) -> Optional[str]:
         return None
     return FLOW[step][0]
 
-def update_slots(slots: dict, raw_text: str) -> None:
-    raw = raw_text.strip()
-    t = raw.lower()
-    step = int(slots.get("_step", 0) or 0)
-    key = next_key(slots)
-
+def _step_value(key: str, raw: str, t: str):
+    """Règles historiques de l'étape courante (texte libre accepté)."""
     if key == "motif":
         if "commande" in t:
-            slots["motif"] = "commande"; slots["_step"] += 1
-        elif "suivi" in t:
-            slots["motif"] = "suivi"; slots["_step"] += 1
-        elif "sav" in t:
-            slots["motif"] = "sav"; slots["_step"] += 1
-        return
-
-    if key == "immat":
-        slots["immat"] = "UNKNOWN" if t in NO_INFO_WORDS else raw
-        slots["_step"] += 1
-        return
-
-    if key == "chassis":
-        slots["chassis"] = "UNKNOWN" if t in NO_INFO_WORDS else raw
-        slots["_step"] += 1
-        return
+            return "commande"
+        if "suivi" in t:
+            return "suivi"
+        if "sav" in t:
+            return "sav"
+        return None
+
+    if key in ("immat", "chassis"):
+        return "UNKNOWN" if t in NO_INFO_WORDS else raw
 
     if key == "piece":
-        p = extract_piece(raw)
-        if p:
-            slots["piece"] = p; slots["_step"] += 1
-        return
+        # "turbocompresseur", "pads de frein", fautes de frappe => index sémantique
+        return resolve_piece(raw)
 
     if key == "type_piece":
         if t in NO_INFO_WORDS:
-            slots["type_piece"] = "UNKNOWN"; slots["_step"] += 1
-            return
-        tp = extract_type_piece(raw)
-        if tp:
-            slots["type_piece"] = tp; slots["_step"] += 1
-        return
+            return "UNKNOWN"
+        return extract_type_piece(raw)
 
     if key == "marque":
-        if len(raw.split()) <= 2:
-            slots["marque"] = raw.title(); slots["_step"] += 1
-        return
+        return raw.title() if len(raw.split()) <= 2 else None
 
     if key == "modele":
-        if any(c.isdigit() for c in raw):
-            slots["modele"] = raw; slots["_step"] += 1
-        return
+        return raw if any(c.isdigit() for c in raw) else None
 
     if key == "annee":
-        y = extract_year(raw)
-        if y:
-            slots["annee"] = y; slots["_step"] += 1
-        return
+        return parse_year(raw)
 
     if key == "coordonnees":
-        c = extract_contact(raw)
-        if c:
-            slots["coordonnees"] = c; slots["_step"] += 1
-        return
+        return extract_contact(raw)
+
+    return None
+
+def _advance(slots: dict) -> None:
+    """Avance _step après toutes les étapes du FLOW déjà remplies."""
+    step = max(0, int(slots.get("_step", 0) or 0))
+    while step < len(FLOW) and slots.get(FLOW[step][0]) not in (None, ""):
+        step += 1
+    slots["_step"] = step
+
+def update_slots(slots: dict, raw_text: str) -> None:
+    raw = raw_text.strip()
+    t = raw.lower()
+    key = next_key(slots)
+
+    # 1) tous les slots reconnus dans le message (parseur déterministe)
+    found = parse_slots(raw)
+
+    # 2) étape courante : si le parseur n'a rien reconnu, règles historiques
+    #    ("je ne l'ai pas", immat / modèle en texte libre...)
+    if key is not None and key not in found:
+        if t in NO_INFO_WORDS or not found:
+            v = _step_value(key, raw, t)
+            if v not in (None, ""):
+                found[key] = v
+
+    # pièce en texte libre ("turbocompresseur"...) même si le message contient autre chose
+    if not slots.get("piece") and "piece" not in found:
+        with stage("piece_lookup"):
+            piece = resolve_piece(raw)
+        if piece:
+            found["piece"] = piece
+
+    # 3) immat / VIN connus => marque, modèle, année sans les demander
+    vehicle, source = {}, None
+    ids = {k: slots.get(k) or found.get(k) for k in ("immat", "chassis")}  # même priorité que la fusion
+    vehicle_keys = ("marque", "modele", "annee")
+    if any(v not in (None, "", "UNKNOWN") for v in ids.values()) and (
+        any(slots.get(k) in (None, "") for k in vehicle_keys) or any(k in found for k in vehicle_keys)
+    ):
+        with stage("vehicle"):
+            vehicle, source = resolve_vehicle(ids["immat"], ids["chassis"])
+    if source == "table":
+        # fiche du registre pour la plaque / le VIN donné : prime sur les devinettes du parseur
+        found.update(vehicle)
+
+    for k, v in found.items():
+        if slots.get(k) in (None, ""):
+            slots[k] = v
+
+    # VIN seulement décodé : complète, ne remplace rien
+    if source == "vin":
+        for k, v in vehicle.items():
+            if slots.get(k) in (None, ""):
+                slots[k] = v
+
+    # 4) saute toutes les étapes déjà satisfaites
+    _advance(slots)
 
 def is_complete(slots: dict) -> bool:
     required = ["motif", "piece", "marque", "modele", "annee", "coordonnees"]
@@ -268,30 +254,43 @@ def process_message(text: str, slots: dict):
     # RESET (100% Ollama)
     if t in RESET_WORDS:
         slots = new_slots()
-        return llm_say("Confirme la réinitialisation et demande le motif.", slots), slots
+        return llm_say(
+            "Confirme la réinitialisation et demande le motif.", slots,
+            priority="greeting", fallback="Nouvelle demande ✅ " + FIXED_QUESTIONS["motif"],
+        ), slots
 
     # GREETING (100% Ollama)
     if t in GREETINGS:
-        return llm_say("Salue brièvement et demande le motif.", slots), slots
+        return llm_say(
+            "Salue brièvement et demande le motif.", slots,
+            priority="greeting", fallback="Bonjour 👋 " + FIXED_QUESTIONS["motif"],
+        ), slots
 
     # Update
-    update_slots(slots, raw)
+    with stage("parse"):
+        update_slots(slots, raw)
 
     # Next question (100% Ollama)
     key = next_key(slots)
     if key is not None:
         instr = dict(FLOW).get(key, "Pose la prochaine question.")
-        return llm_say(instr, slots), slots
+        return llm_say(instr, slots, priority="slot", fallback=FIXED_QUESTIONS.get(key)), slots
 
     # Complete => save lead then give link (100% Ollama)
     if is_complete(slots):
         if not slots.get("_lead_saved"):
-            lead_id = save_lead(slots)
+            with stage("save_lead"):
+                lead_id = save_lead(slots)
             slots["_lead_saved"] = True
             slots["_lead_id"] = str(lead_id)
 
         url = finish_url(slots["_lead_id"])
-        return llm_say(f"Confirme l’enregistrement et donne ce lien: {url}", slots), slots
+        return llm_say(
+            f"Confirme l’enregistrement et donne ce lien: {url}", slots,
+            priority="checkout", fallback=f"Demande enregistrée ✅ Suivi et paiement : {url}",
+        ), slots
 
     # Stock response (100% Ollama)
-    return llm_say(final_stock_sentence(slots), slots), slots
+    with stage("lookup"):
+        instr = final_stock_sentence(slots)
+    return llm_say(instr, slots, priority="checkout"), slots
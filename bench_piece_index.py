@@ -0,0 +1,71 @@
+# bench_piece_index.py
+"""
+Benchmark de l'index sémantique des pièces (sans serveur Ollama).
+
+    python bench_piece_index.py [nb_entrees] [dim]
+
+Catalogue synthétique (défaut: 100 000 entrées, vecteurs de dimension 768,
+comme nomic-embed-text) et embedder simulé. Mesure :
+- la construction de l'index (matrice normalisée) ;
+- une recherche top-k quand la phrase est en cache (cas courant) ;
+- une recherche avec appel au modèle (cache manquant, modèle simulé à coût nul).
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from piece_index import EmbeddingCache, PieceIndex
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    rng = np.random.default_rng(0)
+
+    entries = {f"piece {i}": f"piece {i}" for i in range(n)}
+    base = {f"piece {i}": rng.standard_normal(dim).astype(np.float32) for i in range(n)}
+    calls = [0]
+
+    def embedder(texts):
+        calls[0] += len(texts)
+        return [base.get(t, rng.standard_normal(dim).astype(np.float32)) for t in texts]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "cache.npz"), max_entries=n + 10_000, model="bench")
+
+        t0 = time.perf_counter()
+        index = PieceIndex.build(entries, cache, embedder)
+        print(f"construction : {n} entrées x {dim} en {time.perf_counter() - t0:.2f} s "
+              f"({index.matrix.nbytes / 1e6:.0f} Mo)")
+
+        phrases = [f"client phrase {i}" for i in range(200)]
+        cache.get_many(phrases, embedder)  # chauffe le cache
+
+        def run(label, batch):
+            samples = []
+            for p in batch:
+                t = time.perf_counter()
+                [vec] = cache.get_many([p], embedder)
+                index.top_k(vec, k=5)
+                samples.append((time.perf_counter() - t) * 1000)
+            samples.sort()
+            print(f"{label:<22} : p50 {statistics.median(samples):.2f} ms, "
+                  f"p99 {samples[int(len(samples) * 0.99) - 1]:.2f} ms ({len(samples)} recherches)")
+
+        before = calls[0]
+        run("cache hit + top-5", phrases)
+        print(f"appels modèle pendant les cache hits : {calls[0] - before}")
+        run("cache miss + top-5", [f"nouvelle phrase {i}" for i in range(200)])
+
+        t0 = time.perf_counter()
+        cache.save()
+        reloaded = EmbeddingCache(cache.path, cache.max_entries, model="bench")
+        print(f"cache disque : {len(reloaded)} phrases, save + reload {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
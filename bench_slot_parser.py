@@ -0,0 +1,91 @@
+# bench_slot_parser.py
+"""
+Benchmark du parseur multi-slots.
+
+    python bench_slot_parser.py [nb_messages]
+
+Mesure le débit de parse_slots() et compte les tours (donc les appels LLM)
+nécessaires pour compléter une demande, avant / après le parseur.
+"""
+import sys
+import time
+
+from slot_parser import parse_slots
+
+MESSAGES = [
+    "commande turbo neuf Renault Clio 4 2017 0612345678",
+    "bonjour je veux des plaquettes de frein avant pour ma 208 de 2019",
+    "filtre à huile Golf 6 2012, mail: client@example.com",
+    "suivi de commande immat 12345-A-6",
+    "sav VIN VF1RJA00X12345678 disques arrière",
+    "je ne sais pas",
+    "Dacia Logan 2015 occasion",
+    "AB-123-CD turbo original +212 661 23 45 67",
+]
+
+# cas de non-régression : (message, slots attendus ; None = slot absent)
+REGRESSIONS = [
+    ("AB-208-CD", {"immat": "AB-208-CD", "modele": None, "marque": None}),
+    ("2015-A-6", {"immat": "2015-A-6", "annee": None}),
+    ("1998-B-40", {"immat": "1998-B-40", "annee": None}),
+    ("immat 12345-A-6 Megane 3 2014", {"immat": "12345-A-6", "modele": "Megane 3", "annee": 2014}),
+    ("Megane 3", {"modele": "Megane 3", "marque": "Renault"}),
+    ("Polo 2015", {"modele": "Polo", "annee": 2015}),
+    ("Duster 2", {"modele": "Duster 2", "marque": "Dacia"}),
+    ("Clio 4 2017", {"modele": "Clio 4", "annee": 2017}),
+]
+
+# même conversation, en un message puis étape par étape
+ONE_SHOT = ["commande turbo neuf Renault Clio 4 2017 0612345678", "je ne l'ai pas", "je ne l'ai pas"]
+STEP_BY_STEP = [
+    "commande", "je ne l'ai pas", "je ne l'ai pas", "turbo", "neuf",
+    "Renault", "Clio 4", "2017", "0612345678",
+]
+
+
+def bench_throughput(n: int) -> None:
+    msgs = (MESSAGES * (n // len(MESSAGES) + 1))[:n]
+    t0 = time.perf_counter()
+    for m in msgs:
+        parse_slots(m)
+    dt = time.perf_counter() - t0
+    print(f"parse_slots : {n} messages en {dt * 1000:.1f} ms "
+          f"-> {n / dt:,.0f} msg/s ({dt / n * 1e6:.1f} µs/msg)")
+
+
+def check_regressions() -> int:
+    failures = 0
+    for text, expected in REGRESSIONS:
+        got = parse_slots(text)
+        bad = {k: got.get(k) for k, v in expected.items() if got.get(k) != v}
+        if bad:
+            failures += 1
+            print(f"RÉGRESSION {text!r} : attendu {expected}, obtenu {bad}")
+    return failures
+
+
+def count_turns(conversation: list[str]) -> int:
+    # import local : assistant_slots n'est utile qu'ici
+    from assistant_slots import new_slots, next_key, update_slots
+
+    slots = new_slots()
+    for i, text in enumerate(conversation, start=1):
+        update_slots(slots, text)
+        if next_key(slots) is None:
+            return i
+    return -1
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    failures = check_regressions()
+    print(f"non-régression : {len(REGRESSIONS) - failures}/{len(REGRESSIONS)} cas OK")
+    bench_throughput(n)
+
+    one = count_turns(ONE_SHOT)
+    step = count_turns(STEP_BY_STEP)
+    print(f"tours (= appels LLM) pour une demande complète : {step} étape par étape, {one} en message libre")
+
+
+if __name__ == "__main__":
+    main()
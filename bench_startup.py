@@ -0,0 +1,62 @@
+# bench_startup.py
+"""
+Benchmark du démarrage (processus neufs, imports à froid).
+
+    python bench_startup.py [nb_runs]
+
+- GUI : `python main.py` jusqu'à la fenêtre affichée (time-to-window) ;
+- web : `app.py` jusqu'à la première réponse HTTP (time-to-first-request,
+        via le client de test Flask, sans réseau).
+Chaque mesure inclut le démarrage de l'interpréteur.
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+GUI_PROBE = """
+import ui_gui
+root = ui_gui.build_window()
+root.update()
+print("ready", flush=True)
+root.destroy()
+"""
+
+WEB_PROBE = """
+import app
+resp = app.app.test_client().get("/")
+assert resp.status_code == 200
+print("ready", flush=True)
+"""
+
+
+def time_probe(code: str) -> float:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    dt = time.perf_counter() - t0
+    _, err = proc.communicate()
+    if line.strip() != "ready":
+        raise RuntimeError(err.strip().splitlines()[-1] if err.strip() else "pas de réponse")
+    return dt
+
+
+def bench(name: str, code: str, runs: int) -> None:
+    try:
+        samples = [time_probe(code) for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"{name:<24} : ignoré ({e})")
+        return
+    print(f"{name:<24} : médiane {statistics.median(samples) * 1000:.0f} ms, "
+          f"min {min(samples) * 1000:.0f} ms ({runs} runs)")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    bench("interpréteur seul", "print('ready')", runs)
+    bench("GUI time-to-window", GUI_PROBE, runs)
+    bench("web time-to-first-req", WEB_PROBE, runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# bench_stock_delta.py
+"""
+Benchmark des mises à jour de stock par deltas (catalogue synthétique, dossier temporaire).
+
+    python bench_stock_delta.py [nb_lignes] [nb_deltas] [taille_lot]
+
+Mesure le débit d'application (deltas/s, journal disque compris) pendant
+que des threads font des recherches en continu, et vérifie que chaque
+recherche voit une version cohérente (jamais une ligne à moitié écrite).
+Objectif : >= 10 000 deltas/s.
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+MARQUES = ["Renault", "Peugeot", "Dacia", "Toyota", "Hyundai", "Volkswagen"]
+PIECES = ["Turbo", "Plaquettes de frein", "Alternateur", "Démarreur", "Radiateur", "Embrayage"]
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_deltas = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+    rnd = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stock.csv")
+        keys = [(PIECES[i % 6], MARQUES[(i // 6) % 6], f"Modele {i // 36}", 1990 + i % 35) for i in range(n_rows)]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["piece", "marque", "modele", "annee", "prix", "stock"])
+            for k in keys:
+                w.writerow([*k, 1000, 5])
+        os.environ["AUTOTURBO_STOCK_CSV"] = path
+
+        import config
+        config.reload()
+        from pieces import CATALOG
+        import stock_delta
+
+        t0 = time.perf_counter()
+        CATALOG.snapshot()
+        print(f"chargement initial : {n_rows} lignes en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+        deltas = []
+        for i in range(n_deltas):
+            piece, marque, modele, annee = rnd.choice(keys) if rnd.random() < 0.9 else (
+                "Turbo", "Kia", f"Nouveau {i}", 2024)
+            if rnd.random() < 0.05:
+                deltas.append({"op": "delete", "piece": piece, "marque": marque, "modele": modele, "annee": annee})
+            else:
+                # prix et stock liés : une vue cohérente vérifie prix == 1000 + stock
+                s = rnd.randint(0, 50)
+                deltas.append({"op": "upsert", "piece": piece, "marque": marque, "modele": modele,
+                               "annee": annee, "stock": s, "prix": 1000 + s})
+
+        stop = threading.Event()
+        lookups = [0]
+        torn = [0]
+
+        def reader() -> None:
+            while not stop.is_set():
+                snap = CATALOG.snapshot()
+                for k in rnd.sample(keys, 50):
+                    row = snap.rows.get(tuple(str(x).strip().lower() if j < 3 else str(x) for j, x in enumerate(k)))
+                    if row is not None and int(row["prix"]) != 1000 + int(row["stock"]) and row["stock"] != "5":
+                        torn[0] += 1
+                    lookups[0] += 1
+
+        threads = [threading.Thread(target=reader, daemon=True) for _ in range(2)]
+        for t in threads:
+            t.start()
+
+        t0 = time.perf_counter()
+        res = stock_delta.apply_stream(deltas, batch_size=batch)
+        dt = time.perf_counter() - t0
+        stop.set()
+        for t in threads:
+            t.join()
+
+        print(f"deltas             : {n_deltas} en {dt:.2f} s -> {n_deltas / dt:,.0f} deltas/s "
+              f"(lots de {batch}, {res['batches']} versions, {res['upserts']} upserts, {res['deletes']} deletes)")
+        print(f"recherches         : {lookups[0]} pendant l'application, {torn[0]} incohérente(s)")
+
+        # un autre worker (index neuf) doit retrouver le même état : base + journal
+        from pieces import CatalogIndex, make_key
+        t0 = time.perf_counter()
+        other = CatalogIndex().snapshot()
+        print(f"autre worker       : {len(other.rows)} lignes (mémoire: {res['rows']}) "
+              f"en {(time.perf_counter() - t0) * 1000:.0f} ms, identique: {other.rows == CATALOG.snapshot().rows}")
+
+        # petit lot HTTP typique : ni réécriture du CSV, ni relecture complète ailleurs
+        CATALOG.compact()
+        other = CatalogIndex()
+        other.snapshot()
+        row = next(iter(CATALOG.snapshot().rows.values()))
+        k = (row["piece"], row["marque"], row["modele"], row["annee"])
+        samples = []
+        for s in range(200):
+            t = time.perf_counter()
+            CATALOG.apply_deltas([{"piece": k[0], "marque": k[1], "modele": k[2], "annee": k[3], "stock": s % 50}])
+            samples.append((time.perf_counter() - t) * 1000)
+        samples.sort()
+        t0 = time.perf_counter()
+        snap = other.snapshot()  # rattrape 200 lignes de journal
+        print(f"delta unitaire     : p50 {samples[100]:.2f} ms ; autre worker rattrapé en "
+              f"{(time.perf_counter() - t0) * 1000:.1f} ms (stock={snap.rows[make_key(*k)]['stock']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_workers.py
+"""
+Benchmark du mode multi-workers (gunicorn -c gunicorn.conf.py app:app).
+
+    python bench_workers.py [durée_sec] [clients]
+
+Lance gunicorn avec 1, 2, 4 puis 8 workers, LLM désactivé
+(AUTOTURBO_LLM_ENABLED=false => textes fixes) pour mesurer le travail hors
+LLM de /chat : session, parseur multi-slots, catalogue. Les clients sont des
+processus séparés avec connexions keep-alive, sans cookie et depuis une seule
+IP : la limitation de débit (ratelimit) est donc coupée pendant la mesure.
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MESSAGE = json.dumps({"text": "commande turbo neuf Renault Clio 4 2017 0612345678"})
+PORT = 5055
+
+
+def client(duration: float, out) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=10)
+    n = errors = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        conn.request("POST", "/chat", body=MESSAGE, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            n += 1
+        else:
+            errors += 1
+    conn.close()
+    out.put((n, errors))
+
+
+def wait_ready(timeout: float = 20.0) -> None:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            c = http.client.HTTPConnection("127.0.0.1", PORT, timeout=1)
+            c.request("GET", "/metrics")
+            c.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn ne répond pas")
+
+
+def run(workers: int, duration: float, clients: int, workdir: str) -> tuple:
+    env = dict(
+        os.environ,
+        AUTOTURBO_LLM_ENABLED="false",
+        AUTOTURBO_TRANSCRIPTS_ENABLED="false",
+        AUTOTURBO_RATELIMIT_ENABLED="false",
+        AUTOTURBO_PORT=str(PORT),
+        AUTOTURBO_WORKERS=str(workers),
+        AUTOTURBO_LEADS_CSV=os.path.join(workdir, "leads.csv"),
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning", "app:app"],
+        cwd=here, env=env,
+    )
+    try:
+        wait_ready()
+        out = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client, args=(duration, out)) for _ in range(clients)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        return sum(r[0] for r in results) / duration, sum(r[1] for r in results)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    if shutil.which("gunicorn") is None:
+        print("gunicorn absent : pip install gunicorn")
+        return
+
+    print(f"{os.cpu_count()} cœur(s), {clients} clients, {duration:.0f} s par mesure")
+    base = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for w in (1, 2, 4, 8):
+            rps, errors = run(w, duration, clients, workdir)
+            base = base or rps
+            print(f"{w} worker(s) : {rps:8.0f} req/s  (x{rps / base:.2f})"
+                  + (f"  !! {errors} réponse(s) non 200" if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# config.py
+"""
+Configuration centrale (rechargeable à chaud).
+
+Ordre de priorité : valeurs par défaut < fichier JSON < variables d'environnement.
+- fichier : $AUTOTURBO_CONFIG (défaut: config.json, optionnel)
+- env     : AUTOTURBO_<CLÉ EN MAJUSCULES>, ex. AUTOTURBO_LLM_TIMEOUT_SEC=8
+
+La config est validée au démarrage ; kill -HUP <pid> (ou POST /admin/config/reload)
+la recharge sans redémarrer. Une config invalide est refusée et l'ancienne reste active.
+Les modules lisent config.get() au moment de l'appel, jamais à l'import.
+"""
+import json
+import os
+import signal
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Callable, Dict, List, Optional
+
+ENV_PREFIX = "AUTOTURBO_"
+DEFAULT_PATH = "config.json"
+
+
+@dataclass(frozen=True)
+class Config:
+    # --- LLM ---
+    llm_enabled: bool = True           # False => textes fixes uniquement (aucun appel Ollama)
+    # plusieurs serveurs locaux => round-robin ; vide = $OLLAMA_HOST ou http://127.0.0.1:11434
+    ollama_hosts: List[str] = field(default_factory=list)
+    model: str = "deepseek-r1:7b"
+    llm_temperature: float = 0.1
+    llm_num_predict_short: int = 60    # llm_say (1 phrase)
+    llm_num_predict_long: int = 240    # llm_reply (fiche stock)
+    llm_timeout_sec: float = 6.0       # budget total d'une réponse (retries inclus)
+    llm_connect_timeout_sec: float = 1.0
+    llm_pool_max_connections: int = 4  # keep-alive, par hôte et par processus
+    llm_host_cooldown_sec: float = 2.0 # hôte injoignable : mis de côté (x2 à chaque échec)
+
+    # --- ordonnanceur LLM (llm_queue) : par processus (x workers en production) ---
+    llm_global_limit: int = 2
+    llm_class_limits: Dict[str, int] = field(
+        default_factory=lambda: {"checkout": 2, "slot": 1, "greeting": 1}
+    )
+
+    # --- index sémantique des pièces (piece_index) ---
+    piece_semantic_enabled: bool = True
+    embed_model: str = "nomic-embed-text"
+    embed_timeout_sec: float = 2.0
+    embed_min_score: float = 0.75       # cosinus minimum pour accepter une pièce
+    embed_cache_path: str = os.path.join("data", "embed_cache.npz")
+    embed_cache_max_entries: int = 50_000
+
+    # --- données ---
+    stock_csv: str = os.path.join("data", "stock.csv")
+    leads_csv: str = os.path.join("data", "leads.csv")
+    stock_delta_compact_bytes: int = 1_000_000  # journal stock.csv.deltas fusionné au-delà
+    vehicles_csv: str = os.path.join("data", "vehicles.csv")  # optionnel (immat/VIN -> véhicule)
+
+    # --- export des leads (lead_export) ---
+    leads_max_active_bytes: int = 1_000_000
+    leads_export_interval_sec: float = 60.0
+
+    # --- transcripts (transcript.py) ---
+    transcripts_enabled: bool = True
+    transcripts_dir: str = os.path.join("data", "transcripts")
+    transcripts_max_queue: int = 1000          # file pleine => enregistrement abandonné
+    transcripts_segment_max_bytes: int = 5_000_000
+
+    # --- limitation de débit sur /chat (ratelimit.py) ---
+    ratelimit_enabled: bool = True
+    ratelimit_backend: str = "memory"  # "memory" (par worker) ou "sqlite" (partagé)
+    ratelimit_sqlite_path: str = os.path.join("data", "ratelimit.sqlite3")
+    # [jetons par minute, rafale] ; turn_* épuisé => 429, llm_* épuisé => réponse sans LLM
+    ratelimit_budgets: Dict[str, List[float]] = field(
+        default_factory=lambda: {
+            "turn_session": [30, 10], "turn_ip": [120, 40],
+            "llm_session": [10, 5], "llm_ip": [40, 15],
+        }
+    )
+    chat_max_chars: int = 1000
+    trust_forwarded_for: bool = False  # derrière un reverse proxy : IP = X-Forwarded-For
+
+    # --- web ---
+    # routes /admin/* : jeton (en-tête X-Admin-Token) ; vide => appels locaux uniquement
+    admin_token: str = ""
+    host: str = "127.0.0.1"
+    port: int = 5000
+    debug: bool = True
+
+    # --- production (gunicorn.conf.py) ---
+    workers: int = 0                   # 0 = nombre de cœurs
+    worker_threads: int = 4            # requêtes simultanées par worker (attente LLM)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def validate(cfg: Config) -> None:
+    """Lève ValueError si une valeur est incohérente."""
+    errors: List[str] = []
+    if not cfg.model:
+        errors.append("model vide")
+    if not 0.0 <= cfg.llm_temperature <= 2.0:
+        errors.append("llm_temperature doit être entre 0 et 2")
+    if cfg.llm_num_predict_short <= 0 or cfg.llm_num_predict_long <= 0:
+        errors.append("llm_num_predict_* doit être > 0")
+    if cfg.llm_timeout_sec <= 0 or cfg.llm_connect_timeout_sec <= 0:
+        errors.append("llm_timeout_sec / llm_connect_timeout_sec doivent être > 0")
+    if cfg.llm_pool_max_connections < 1 or cfg.llm_host_cooldown_sec < 0:
+        errors.append("llm_pool_max_connections doit être >= 1, llm_host_cooldown_sec >= 0")
+    if not -1.0 <= cfg.embed_min_score <= 1.0:
+        errors.append("embed_min_score doit être entre -1 et 1")
+    if cfg.embed_timeout_sec <= 0 or cfg.embed_cache_max_entries < 0:
+        errors.append("embed_timeout_sec doit être > 0, embed_cache_max_entries >= 0")
+    if cfg.llm_global_limit < 1:
+        errors.append("llm_global_limit doit être >= 1")
+    for cls, n in cfg.llm_class_limits.items():
+        if not isinstance(n, int) or n < 1:
+            errors.append(f"llm_class_limits[{cls}] doit être un entier >= 1")
+    if not os.path.exists(cfg.stock_csv):
+        errors.append(f"stock_csv introuvable: {cfg.stock_csv}")
+    if cfg.stock_delta_compact_bytes <= 0:
+        errors.append("stock_delta_compact_bytes doit être > 0")
+    if cfg.leads_max_active_bytes <= 0 or cfg.leads_export_interval_sec <= 0:
+        errors.append("leads_max_active_bytes / leads_export_interval_sec doivent être > 0")
+    if cfg.transcripts_max_queue < 1 or cfg.transcripts_segment_max_bytes <= 0:
+        errors.append("transcripts_max_queue / transcripts_segment_max_bytes doivent être > 0")
+    if cfg.ratelimit_backend not in ("memory", "sqlite"):
+        errors.append("ratelimit_backend doit être 'memory' ou 'sqlite'")
+    for name in ("turn_session", "turn_ip", "llm_session", "llm_ip"):
+        v = cfg.ratelimit_budgets.get(name)
+        if not isinstance(v, list) or len(v) != 2 or not all(isinstance(x, (int, float)) and x > 0 for x in v):
+            errors.append(f"ratelimit_budgets[{name}] doit être [par minute > 0, rafale > 0]")
+        elif v[1] < 1:
+            errors.append(f"ratelimit_budgets[{name}] : rafale >= 1")
+    if cfg.chat_max_chars < 1:
+        errors.append("chat_max_chars doit être >= 1")
+    if cfg.workers < 0 or cfg.worker_threads < 1:
+        errors.append("workers doit être >= 0, worker_threads >= 1")
+    if not 0 < cfg.port < 65536:
+        errors.append("port invalide")
+    if errors:
+        raise ValueError("config invalide: " + "; ".join(errors))
+
+
+# ---------- CHARGEMENT ----------
+
+def _coerce(raw: str, current):
+    """Convertit une valeur d'env (str) vers le type du champ."""
+    if isinstance(current, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on", "oui")
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    if isinstance(current, dict):
+        return json.loads(raw)
+    if isinstance(current, list):
+        # AUTOTURBO_OLLAMA_HOSTS=http://h1:11434,http://h2:11434
+        return [x.strip() for x in raw.split(",") if x.strip()]
+    return raw
+
+
+def _check_types(data: dict, source: str) -> None:
+    """Lève ValueError si une valeur n'a pas le type de la valeur par défaut."""
+    defaults = Config()
+    errors = []
+    for name, value in data.items():
+        expected = type(getattr(defaults, name))
+        if expected is float:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif expected is int:
+            ok = isinstance(value, int) and not isinstance(value, bool)
+        elif expected is list:
+            ok = isinstance(value, list) and all(isinstance(x, str) for x in value)
+        else:
+            ok = isinstance(value, expected)
+        if not ok:
+            errors.append(f"{name}: {expected.__name__} attendu, reçu {value!r}")
+    if errors:
+        raise ValueError(f"types invalides dans {source}: " + "; ".join(errors))
+
+
+def load(path: Optional[str] = None) -> Config:
+    cfg = Config()
+    path = path or os.environ.get(ENV_PREFIX + "CONFIG", DEFAULT_PATH)
+
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: objet JSON attendu")
+        known = {f.name for f in fields(Config)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"clés inconnues dans {path}: {sorted(unknown)}")
+        _check_types(data, path)
+        cfg = replace(cfg, **{k: float(v) if isinstance(getattr(cfg, k), float) else v for k, v in data.items()})
+
+    overrides = {}
+    for f in fields(Config):
+        raw = os.environ.get(ENV_PREFIX + f.name.upper())
+        if raw is not None:
+            overrides[f.name] = _coerce(raw, getattr(cfg, f.name))
+    if overrides:
+        _check_types(overrides, "l'environnement")
+        cfg = replace(cfg, **overrides)
+
+    validate(cfg)
+    return cfg
+
+
+# ---------- ÉTAT COURANT ----------
+
+_current: Optional[Config] = None
+_loaded_at: float = 0.0
+_lock = threading.Lock()
+_listeners: List[Callable[[Config], None]] = []
+
+
+def get() -> Config:
+    global _current, _loaded_at
+    cfg = _current
+    if cfg is None:
+        with _lock:
+            if _current is None:
+                _current = load()
+                _loaded_at = time.time()
+            cfg = _current
+    return cfg
+
+
+def reload() -> Config:
+    """Recharge fichier + env. Garde l'ancienne config si la nouvelle est invalide."""
+    global _current, _loaded_at
+    cfg = load()
+    with _lock:
+        _current = cfg
+        _loaded_at = time.time()
+    for cb in list(_listeners):
+        cb(cfg)
+    return cfg
+
+
+def on_reload(callback: Callable[[Config], None]) -> None:
+    """Enregistre une fonction appelée après chaque rechargement réussi."""
+    _listeners.append(callback)
+
+
+def install_sighup() -> bool:
+    """Recharge la config sur SIGHUP (POSIX, thread principal uniquement)."""
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def _handler(signum, frame):
+        try:
+            reload()
+            print("config: rechargée (SIGHUP)")
+        except Exception as e:
+            print("config: rechargement refusé:", e)
+
+    signal.signal(signal.SIGHUP, _handler)
+    return True
+
+
+def snapshot() -> dict:
+    """Config effective + métadonnées (endpoint admin)."""
+    cfg = get()
+    return {
+        "config": {**cfg.as_dict(), "admin_token": "***" if cfg.admin_token else ""},
+        "source": os.environ.get(ENV_PREFIX + "CONFIG", DEFAULT_PATH),
+        "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_loaded_at)),
+    }
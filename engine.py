@@ -0,0 +1,192 @@
+# engine.py
+"""
+Moteur de conversation partagé (assistant.py, assistant_slots.py, test_ollama.py).
+
+- extraction : une seule couche, basée sur les regex précompilées de slot_parser ;
+- LLM        : un seul client Ollama (llm_client : pool keep-alive, round-robin,
+               timeouts), un seul chemin appel / parsing / retry, via l'ordonnanceur ;
+- catalogue  : un seul index du stock (pieces.CATALOG).
+"""
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+import config
+import llm_client
+import piece_index
+import transcript
+import vehicles
+from llm_queue import get_scheduler
+from pieces import CATALOG, rechercher_piece
+from slot_parser import (
+    KNOWN_BRANDS, KNOWN_MODELS, PIECES_KNOWN, TYPE_WORDS, RE_PHONE, RE_EMAIL,
+    parse_motif, parse_piece, parse_slots, parse_year,
+)
+
+__all__ = [
+    "KNOWN_BRANDS", "KNOWN_MODELS", "PIECES_KNOWN", "TYPE_WORDS",
+    "normalize_text", "parse_year", "parse_piece", "resolve_piece", "resolve_vehicle",
+    "extract_type_piece", "extract_contact", "parse_motif", "parse_slots",
+    "chat", "ask", "CATALOG", "rechercher_piece", "build_fiche_stock",
+]
+
+
+# ---------- NORMALISATION / EXTRACTION ----------
+
+_RE_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    # Support: "turbo,Renault,Clio_4,2017"
+    text = text.strip()
+    text = text.replace(",", " ").replace("_", " ")
+    return _RE_SPACES.sub(" ", text)
+
+
+def resolve_piece(text: str) -> Optional[str]:
+    """parse_piece, sinon recherche sémantique dans le catalogue (piece_index)."""
+    return parse_piece(text) or piece_index.lookup(text)
+
+
+def resolve_vehicle(immat: Optional[str], chassis: Optional[str]) -> Tuple[dict, Optional[str]]:
+    """({marque, modele, annee}, source "table" / "vin" / None) depuis l'immatriculation ou le VIN."""
+    return vehicles.lookup(immat=immat, vin=chassis)
+
+
+def extract_type_piece(text: str) -> Optional[str]:
+    t = text.lower()
+    return text.strip() if any(w in t for w in TYPE_WORDS) else None
+
+
+def extract_contact(text: str) -> Optional[str]:
+    if RE_PHONE.search(text) or RE_EMAIL.search(text):
+        return text.strip()
+    return None
+
+
+def build_fiche_stock(row: dict) -> str:
+    return (
+        "FICHE_STOCK (source: stock.csv)\n"
+        f"- piece: {row['piece']}\n"
+        f"- marque: {row['marque']}\n"
+        f"- modele: {row['modele']}\n"
+        f"- annee: {row['annee']}\n"
+        f"- prix_DH: {row['prix']}\n"
+        f"- stock: {row['stock']}\n"
+        "Règle: répondre uniquement à partir de FICHE_STOCK."
+    )
+
+
+# ---------- CLIENT LLM ----------
+
+def _message_text(resp: dict) -> Tuple[str, str]:
+    """(content, thinking) d'une réponse /api/chat."""
+    msg = resp.get("message") or {}
+    return (msg.get("content") or "").strip(), (msg.get("thinking") or "").strip()
+
+
+def chat(
+    messages: List[dict],
+    num_predict: int,
+    stop: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[str, str]:
+    """Un seul appel Ollama (sans retry). Lève une exception si le serveur échoue."""
+    cfg = config.get()
+    options = {"temperature": cfg.llm_temperature, "num_predict": num_predict}
+    if stop:
+        options["stop"] = stop
+    resp = llm_client.chat(cfg.model, messages, options, timeout=timeout)
+    return _message_text(resp)
+
+
+_llm_allowed: contextvars.ContextVar = contextvars.ContextVar("llm_allowed", default=True)
+
+
+@contextmanager
+def deterministic():
+    """Dans ce bloc, ask() renvoie directement son texte fixe (budget LLM épuisé, etc.)."""
+    token = _llm_allowed.set(False)
+    try:
+        yield
+    finally:
+        _llm_allowed.reset(token)
+
+
+def ask(
+    messages: List[dict],
+    num_predict: int,
+    fallback: str,
+    priority: str = "slot",
+    clean: Callable[[str], str] = str.strip,
+    stop: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Réponse LLM robuste : passe par l'ordonnanceur, retente (vide / erreur)
+    jusqu'à la deadline, puis renvoie le texte fixe `fallback`.
+    """
+    cfg = config.get()
+    timeout = timeout or cfg.llm_timeout_sec
+    trace = transcript.current()
+    if not cfg.llm_enabled or not _llm_allowed.get():
+        if trace is not None:
+            trace.add_llm(messages, fallback, 0.0, 0.0, fallback=True)
+        return fallback
+
+    submitted = time.monotonic()
+    started = [submitted]  # reste = submitted si le job est abandonné dans la file
+
+    def job(deadline: float) -> str:
+        started[0] = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                # la requête HTTP ne dépasse jamais la deadline de l'appel
+                content, thinking = chat(messages, num_predict, stop, timeout=deadline - time.monotonic())
+            except Exception:
+                # pause courte : un serveur tombé est en cooldown, pas de rafale de connexions
+                time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+                continue
+            # deepseek-r1 met parfois la réponse dans thinking
+            out = clean(content) or clean(thinking)
+            if out:
+                return out
+        return fallback
+
+    out = get_scheduler().submit(priority, job, fallback=fallback, timeout=timeout)
+    if trace is not None:
+        end = time.monotonic()
+        trace.add_llm(messages, out, started[0] - submitted, end - started[0], fallback=out == fallback)
+    return out
+
+
+# ---------- DÉMARRAGE ----------
+
+def preload() -> None:
+    """
+    Données en lecture seule, chargées dans le master gunicorn avant le fork
+    (partagées en copy-on-write) : catalogue + cache d'embeddings sur disque.
+    Pas de pool HTTP ici : les sockets ne doivent pas être partagées entre workers.
+    """
+    CATALOG.rows()
+    vehicles.REGISTRY.table()
+    try:
+        piece_index.preload()
+    except ImportError:
+        pass  # NumPy absent : index sémantique désactivé
+
+
+def warmup() -> None:
+    """Charge le catalogue, le pool HTTP (httpx) et l'index des pièces : à lancer après l'affichage de l'UI."""
+    CATALOG.rows()
+    llm_client.get_pool()
+    piece_index.start_build()
+
+
+def start_warmup() -> threading.Thread:
+    t = threading.Thread(target=warmup, name="engine-warmup", daemon=True)
+    t.start()
+    return t
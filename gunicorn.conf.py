@@ -0,0 +1,45 @@
+# gunicorn.conf.py
+"""
+Mode production (multi-workers) :
+
+    gunicorn -c gunicorn.conf.py app:app
+
+- preload_app : app.py, le catalogue et le cache d'embeddings sont chargés une
+  fois dans le master, puis partagés en copy-on-write avec les workers
+  (gc.freeze évite que le GC ne recopie ces pages) ;
+- chaque worker crée après le fork son pool HTTP Ollama, ses threads de fond
+  (export des leads, transcripts) et relit la config ;
+- les écritures de leads.csv passent par un verrou fichier (order.leads_lock).
+
+La concurrence LLM totale vaut workers x llm_global_limit.
+"""
+import gc
+import multiprocessing
+
+import config as _config  # "config" est un réglage gunicorn : pas de nom nu au niveau module
+
+_cfg = _config.get()
+
+bind = f"{_cfg.host}:{_cfg.port}"
+workers = _cfg.workers or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = _cfg.worker_threads
+preload_app = True
+timeout = int(_cfg.llm_timeout_sec * 2 + 30)
+
+
+def when_ready(server):
+    import engine
+
+    engine.preload()
+    gc.freeze()  # objets du master => pages partagées, jamais réécrites par le GC
+    server.log.info("AutoTurbo: catalogue et caches préchargés avant fork")
+
+
+def post_fork(server, worker):
+    import engine
+    import lead_export
+
+    _config.reload()  # un kill -HUP du master relance les workers avec la nouvelle config
+    lead_export.start_background()
+    engine.start_warmup()
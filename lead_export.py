@@ -0,0 +1,244 @@
+# lead_export.py
+"""
+Pipeline d'export des leads (tâche de fond).
+
+- rotation : data/leads.csv est déplacé dans data/leads_archive/ dès qu'il
+  dépasse une taille max ou qu'il contient des leads d'un jour passé ;
+- compaction : chaque segment CSV archivé devient un .ndjson.gz ;
+- agrégats : leads par jour / pièce / marque / motif, tenus à jour de façon
+  incrémentale dans data/leads_summary.json.
+
+Les rapports lisent le résumé + le fichier actif (petit), jamais l'historique.
+
+    python lead_export.py run       # rotation + compaction une fois
+    python lead_export.py report [YYYY-MM-DD]
+"""
+import csv
+import gzip
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import config
+import order
+from locks import file_lock
+
+AGG_FIELDS = ["piece", "marque", "motif"]
+
+
+# ---------- CHEMINS (à côté de leads_csv) ----------
+
+def archive_dir() -> str:
+    return os.path.join(os.path.dirname(order.leads_csv()), "leads_archive")
+
+
+def summary_json() -> str:
+    return os.path.join(os.path.dirname(order.leads_csv()), "leads_summary.json")
+
+
+# ---------- RÉSUMÉ ----------
+
+def load_summary() -> dict:
+    path = summary_json()
+    if not os.path.exists(path):
+        return {"segments": [], "days": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_summary(summary: dict) -> None:
+    path = summary_json()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _day(row: dict) -> str:
+    return (row.get("created_at") or "")[:10] or "inconnu"
+
+
+def aggregate(rows: Iterable[dict], days: Optional[dict] = None) -> dict:
+    """Ajoute les lignes aux agrégats journaliers (days est modifié en place)."""
+    days = {} if days is None else days
+    for row in rows:
+        d = days.setdefault(_day(row), {"total": 0, **{k: {} for k in AGG_FIELDS}})
+        d["total"] += 1
+        for k in AGG_FIELDS:
+            v = row.get(k) or "?"
+            d[k][v] = d[k].get(v, 0) + 1
+    return days
+
+
+# ---------- ROTATION ----------
+
+def _first_day(path: str) -> Optional[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            return _day(row)
+    return None
+
+
+def rotate_if_needed(max_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Déplace le fichier actif vers l'archive si besoin.
+    Retourne le chemin du segment créé (ou None).
+    """
+    if max_bytes is None:
+        max_bytes = config.get().leads_max_active_bytes
+    with order.leads_lock():
+        path = order.leads_csv()
+        if not os.path.exists(path):
+            return None
+
+        first = _first_day(path)
+        if first is None:  # en-tête seul
+            return None
+
+        today = datetime.now().date().isoformat()
+        if os.path.getsize(path) < max_bytes and first >= today:
+            return None
+
+        os.makedirs(archive_dir(), exist_ok=True)
+        name = "leads-" + datetime.now().strftime("%Y%m%dT%H%M%S%f") + ".csv"
+        segment = os.path.join(archive_dir(), name)
+        os.replace(path, segment)
+        order.ensure_file()
+        return segment
+
+
+# ---------- COMPACTION ----------
+
+def compact_pending() -> int:
+    """
+    Compacte chaque segment CSV archivé en .ndjson.gz et met à jour les agrégats.
+    Idempotent : un segment déjà compté (nom dans le résumé) n'est pas recompté.
+    """
+    adir = archive_dir()
+    if not os.path.isdir(adir):
+        return 0
+
+    # plusieurs workers : un seul compacte à la fois, les autres passent leur tour
+    with file_lock(os.path.join(adir, ".compact.lock"), blocking=False) as acquired:
+        if not acquired:
+            return 0
+        return _compact(adir)
+
+
+def _compact(adir: str) -> int:
+    summary = load_summary()
+    done = set(summary["segments"])
+    count = 0
+
+    for name in sorted(os.listdir(adir)):
+        if not name.endswith(".csv"):
+            continue
+        src = os.path.join(adir, name)
+        dst = src[:-4] + ".ndjson.gz"
+
+        with open(src, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        tmp = dst + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as out:
+            for row in rows:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp, dst)
+
+        if name not in done:
+            aggregate(rows, summary["days"])
+            summary["segments"].append(name)
+            _save_summary(summary)
+
+        os.remove(src)
+        count += 1
+
+    return count
+
+
+def run_once(max_bytes: Optional[int] = None) -> int:
+    rotate_if_needed(max_bytes)
+    return compact_pending()
+
+
+# ---------- RAPPORTS ----------
+
+def report(day: Optional[str] = None) -> dict:
+    """
+    Agrégats (résumé précalculé + fichier actif).
+    day=None => total toutes dates confondues.
+    """
+    days = json.loads(json.dumps(load_summary()["days"]))  # copie profonde
+
+    if os.path.exists(order.leads_csv()):
+        with open(order.leads_csv(), newline="", encoding="utf-8") as f:
+            aggregate(csv.DictReader(f), days)
+
+    if day is not None:
+        return days.get(day, {"total": 0, **{k: {} for k in AGG_FIELDS}})
+
+    total: Dict[str, object] = {"total": 0, **{k: Counter() for k in AGG_FIELDS}}
+    for d in days.values():
+        total["total"] += d["total"]
+        for k in AGG_FIELDS:
+            total[k].update(d[k])
+    return {"total": total["total"], **{k: dict(total[k]) for k in AGG_FIELDS}}
+
+
+def read_archive() -> Iterable[dict]:
+    """Relit tout l'historique compacté (export complet, hors chemin chaud)."""
+    adir = archive_dir()
+    if not os.path.isdir(adir):
+        return
+    for name in sorted(os.listdir(adir)):
+        if name.endswith(".ndjson.gz"):
+            with gzip.open(os.path.join(adir, name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+# ---------- TÂCHE DE FOND ----------
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def start_background() -> threading.Thread:
+    """
+    Lance la rotation / compaction périodique dans un thread daemon (une seule fois).
+    Intervalle et taille max sont relus dans la config à chaque tour.
+    """
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return _thread
+
+    def loop():
+        while not _stop.is_set():
+            try:
+                run_once()
+            except Exception as e:
+                print("lead_export:", e, file=sys.stderr)
+            _stop.wait(config.get().leads_export_interval_sec)
+
+    _stop.clear()
+    _thread = threading.Thread(target=loop, name="lead-export", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def stop_background() -> None:
+    _stop.set()
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "run"
+    if cmd == "run":
+        print(f"{run_once()} segment(s) compacté(s)")
+    elif cmd == "report":
+        print(json.dumps(report(sys.argv[2] if len(sys.argv) > 2 else None), ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
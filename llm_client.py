@@ -0,0 +1,245 @@
+# llm_client.py
+"""
+Client HTTP Ollama géré (un pool keep-alive par hôte et par processus).
+
+- plusieurs serveurs Ollama locaux : round-robin (config.ollama_hosts) ;
+- timeout par requête (= temps restant avant la deadline de l'appel) ;
+- hôte en erreur de connexion => mis de côté (cooldown exponentiel),
+  pas de tempête de connexions quand le serveur est tombé ;
+- métriques par hôte : requêtes, erreurs, latence, connexions ouvertes / actives.
+
+Appels directs à l'API REST (/api/chat, /api/embed), sans le client global d'ollama.
+httpx est importé au premier appel : l'import de ce module ne coûte rien au démarrage.
+"""
+import itertools
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import config
+
+DEFAULT_HOST = "http://127.0.0.1:11434"
+
+
+class NoHealthyHost(RuntimeError):
+    """Tous les hôtes Ollama sont en cooldown."""
+
+
+def _normalize_host(host: str) -> str:
+    host = host.strip().rstrip("/")
+    if "://" not in host:
+        host = "http://" + host
+    return host
+
+
+class _Host:
+    def __init__(self, url: str, cfg: config.Config) -> None:
+        import httpx
+
+        self.url = url
+        self.http = httpx.Client(
+            base_url=url,
+            timeout=httpx.Timeout(cfg.llm_timeout_sec, connect=cfg.llm_connect_timeout_sec),
+            limits=httpx.Limits(
+                max_connections=cfg.llm_pool_max_connections,
+                max_keepalive_connections=cfg.llm_pool_max_connections,
+            ),
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+        )
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency_total = 0.0
+        self.failures = 0          # échecs de connexion consécutifs
+        self.down_until = 0.0
+
+    def is_up(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def connections(self) -> Dict[str, int]:
+        # httpcore : une entrée par connexion TCP gardée dans le pool
+        pool = getattr(self.http._transport, "_pool", None)
+        conns = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in conns if c.is_idle())
+        return {"open": len(conns), "idle": idle, "active": len(conns) - idle}
+
+    def stats(self) -> dict:
+        done = self.requests - self.in_flight
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "latency_avg_ms": round(1000 * self.latency_total / done, 1) if done else 0.0,
+            "up": self.is_up(time.monotonic()),
+            "connections": self.connections(),
+        }
+
+
+class OllamaPool:
+    def __init__(self, cfg: config.Config) -> None:
+        urls = [_normalize_host(h) for h in cfg.ollama_hosts if h.strip()]
+        if not urls:
+            urls = [_normalize_host(os.environ.get("OLLAMA_HOST") or DEFAULT_HOST)]
+        self.cfg = cfg
+        self.pid = os.getpid()
+        self.hosts = [_Host(u, cfg) for u in urls]
+        self._rr = itertools.cycle(range(len(self.hosts)))
+        self._lock = threading.Lock()
+        self._retired = False
+        self._closed = False
+
+    def close(self) -> None:
+        for h in self.hosts:
+            h.http.close()
+
+    def adopt(self, old: "OllamaPool") -> None:
+        """Reprend métriques et cooldowns des hôtes communs avec l'ancien pool."""
+        prev = {h.url: h for h in old.hosts}
+        with old._lock:
+            for h in self.hosts:
+                o = prev.get(h.url)
+                if o is not None:
+                    h.requests = o.requests - o.in_flight
+                    h.errors, h.latency_total = o.errors, o.latency_total
+                    h.failures, h.down_until = o.failures, o.down_until
+
+    def retire(self) -> None:
+        """Remplacé par un nouveau pool : fermé dès que ses requêtes en cours sont finies."""
+        with self._lock:
+            self._retired = True
+            self._close_if_idle()
+
+    def _close_if_idle(self) -> None:
+        # appelé sous self._lock
+        if self._retired and not self._closed and not any(h.in_flight for h in self.hosts):
+            self._closed = True
+            self.close()
+
+    def _pick(self) -> Optional[_Host]:
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return None  # pool remplacé entre get_pool() et ici
+            for _ in range(len(self.hosts)):
+                h = self.hosts[next(self._rr)]
+                if h.is_up(now):
+                    h.requests += 1
+                    h.in_flight += 1
+                    return h
+        raise NoHealthyHost("aucun serveur Ollama disponible")
+
+    def _mark_down(self, h: _Host) -> None:
+        h.failures += 1
+        cooldown = min(30.0, self.cfg.llm_host_cooldown_sec * 2 ** (h.failures - 1))
+        h.down_until = time.monotonic() + cooldown
+
+    def post(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        """POST JSON sur le prochain hôte disponible. timeout = temps max de cette requête."""
+        import httpx
+
+        h = self._pick()
+        if h is None:
+            return get_pool().post(path, payload, timeout=timeout)
+        started = time.monotonic()
+        try:
+            kwargs = {}
+            if timeout is not None:
+                kwargs["timeout"] = httpx.Timeout(
+                    max(0.05, timeout), connect=min(self.cfg.llm_connect_timeout_sec, max(0.05, timeout))
+                )
+            resp = h.http.post(path, json=payload, **kwargs)
+            resp.raise_for_status()
+            data = resp.json()
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            with self._lock:
+                h.errors += 1
+                self._mark_down(h)
+            raise
+        except Exception:
+            with self._lock:
+                h.errors += 1
+            raise
+        else:
+            with self._lock:
+                h.failures = 0
+                h.down_until = 0.0
+            return data
+        finally:
+            with self._lock:
+                h.in_flight -= 1
+                h.latency_total += time.monotonic() - started
+                self._close_if_idle()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {h.url: h.stats() for h in self.hosts}
+
+
+# ---------- POOL DU PROCESSUS ----------
+
+_pool: Optional[OllamaPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OllamaPool:
+    """Pool unique par processus (recréé après fork ou rechargement de config)."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = OllamaPool(config.get())
+            pool = _pool
+    return pool
+
+
+def _pool_key(cfg: config.Config) -> tuple:
+    # ce qui est figé dans les clients httpx ; le reste (cooldown...) est lu à chaque appel
+    return (
+        tuple(_normalize_host(h) for h in cfg.ollama_hosts if h.strip()),
+        cfg.llm_timeout_sec, cfg.llm_connect_timeout_sec, cfg.llm_pool_max_connections,
+    )
+
+
+def _reset(cfg: config.Config) -> None:
+    """
+    Rechargement de config : pool reconstruit seulement si hôtes / timeouts / taille changent.
+    Les requêtes en cours finissent sur l'ancien pool, fermé ensuite (voir retire).
+    """
+    global _pool
+    with _pool_lock:
+        old = _pool
+        if old is None or old.pid != os.getpid():
+            return
+        if _pool_key(cfg) == _pool_key(old.cfg):
+            old.cfg = cfg
+            return
+        _pool = OllamaPool(cfg)
+        _pool.adopt(old)
+    old.retire()
+
+
+config.on_reload(_reset)
+
+
+def chat(
+    model: str,
+    messages: List[dict],
+    options: dict,
+    timeout: Optional[float] = None,
+) -> dict:
+    return get_pool().post(
+        "/api/chat",
+        {"model": model, "messages": messages, "options": options, "stream": False},
+        timeout=timeout,
+    )
+
+
+def embed(model: str, inputs: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+    data = get_pool().post("/api/embed", {"model": model, "input": inputs}, timeout=timeout)
+    return data.get("embeddings") or []
+
+
+def stats() -> Dict[str, dict]:
+    return get_pool().stats() if _pool is not None else {}
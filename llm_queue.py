@@ -0,0 +1,189 @@
+# llm_queue.py
+"""
+Ordonnanceur des appels LLM (en mémoire, dans le processus).
+
+Chaque appel Ollama passe par une classe de priorité :
+- "checkout" : lien de commande / réponse stock (le client est sur le point de finir)
+- "slot"     : question suivante du FLOW
+- "greeting" : salutation / reset
+
+Le job le plus prioritaire passe d'abord, chaque classe a son plafond de
+concurrence, et un job dont la deadline ne peut plus être tenue est abandonné
+au profit d'un texte fixe.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import config
+
+# plus petit = plus prioritaire
+PRIORITIES = {
+    "checkout": 0,
+    "slot": 1,
+    "greeting": 2,
+}
+
+
+class _ClassStats:
+    def __init__(self) -> None:
+        self.queued = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_ewma = 0.0  # durée moyenne d'un job (pour prévoir les deadlines ratées)
+
+    def as_dict(self) -> dict:
+        started = self.completed + self.running
+        return {
+            "queue_depth": self.queued,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "wait_avg_ms": round(1000 * self.wait_total / started, 1) if started else 0.0,
+            "wait_max_ms": round(1000 * self.wait_max, 1),
+            "run_avg_ms": round(1000 * self.run_ewma, 1),
+        }
+
+
+class LLMScheduler:
+    """
+    File de priorité bloquante : submit() attend son tour, exécute le job
+    dans le thread appelant, puis libère la place.
+    """
+
+    def __init__(
+        self,
+        class_limits: Dict[str, int],
+        global_limit: int,
+        priorities: Dict[str, int] = PRIORITIES,
+    ) -> None:
+        self.priorities = dict(priorities)
+        self.class_limits = dict(class_limits)
+        self.global_limit = global_limit
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._stats = {c: _ClassStats() for c in self.priorities}
+
+    def configure(self, class_limits: Dict[str, int], global_limit: int) -> None:
+        """Change les plafonds à chaud (rechargement de config)."""
+        with self._cond:
+            self.class_limits = dict(class_limits)
+            self.global_limit = global_limit
+            self._cond.notify_all()
+
+    # ---------- admission ----------
+
+    def _can_start(self, cls: str) -> bool:
+        if self._running >= self.global_limit:
+            return False
+        return self._stats[cls].running < self.class_limits.get(cls, 1)
+
+    def _is_my_turn(self, ticket: tuple) -> bool:
+        """
+        Le ticket passe si aucun ticket plus prioritaire (et démarrable) n'attend.
+        Un ticket bloqué par le plafond de sa classe ne bloque pas les autres.
+        """
+        cls = ticket[3]
+        if not self._can_start(cls):
+            return False
+        for other in sorted(self._heap):
+            if other is ticket:
+                return True
+            if self._can_start(other[3]):
+                return False
+        return False
+
+    def _will_miss(self, cls: str, deadline: float, timeout: float) -> bool:
+        # plafonné à la moitié du budget : un job neuf n'est jamais refusé d'office
+        expected = min(self._stats[cls].run_ewma, timeout / 2)
+        return time.monotonic() + expected >= deadline
+
+    # ---------- API ----------
+
+    def submit(
+        self,
+        cls: str,
+        job: Callable[[float], str],
+        fallback: str,
+        timeout: float,
+    ) -> str:
+        """
+        Exécute job(deadline) quand c'est son tour.
+        deadline = time.monotonic() absolu, à respecter par le job.
+        Renvoie fallback si la deadline est (ou sera) ratée avant de démarrer.
+        """
+        if cls not in self.priorities:
+            cls = "slot"
+
+        enqueued = time.monotonic()
+        deadline = enqueued + timeout
+        stats = self._stats[cls]
+        ticket = (self.priorities[cls], next(self._seq), deadline, cls)
+
+        with self._cond:
+            stats.submitted += 1
+            stats.queued += 1
+            heapq.heappush(self._heap, ticket)
+
+            while True:
+                if self._will_miss(cls, deadline, timeout):
+                    self._heap.remove(ticket)
+                    heapq.heapify(self._heap)
+                    stats.queued -= 1
+                    stats.dropped += 1
+                    self._cond.notify_all()
+                    return fallback
+
+                if self._is_my_turn(ticket):
+                    break
+
+                self._cond.wait(timeout=max(0.0, deadline - time.monotonic()))
+
+            self._heap.remove(ticket)
+            heapq.heapify(self._heap)
+            stats.queued -= 1
+            stats.running += 1
+            self._running += 1
+            waited = time.monotonic() - enqueued
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+
+        started = time.monotonic()
+        try:
+            return job(deadline)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                stats.running -= 1
+                stats.completed += 1
+                self._running -= 1
+                stats.run_ewma = elapsed if stats.run_ewma == 0.0 else 0.8 * stats.run_ewma + 0.2 * elapsed
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._cond:
+            return {cls: s.as_dict() for cls, s in self._stats.items()}
+
+
+_scheduler: Optional[LLMScheduler] = None
+_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Ordonnanceur unique du processus, plafonds issus de la config (llm_class_limits / llm_global_limit)."""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            cfg = config.get()
+            _scheduler = LLMScheduler(cfg.llm_class_limits, cfg.llm_global_limit)
+            config.on_reload(lambda c: _scheduler.configure(c.llm_class_limits, c.llm_global_limit))
+        return _scheduler
@@ -0,0 +1,39 @@
+# locks.py
+"""
+Verrou fichier partagé entre workers (gunicorn) : flock sur <fichier>.lock.
+
+Utilisé par le catalogue (pieces), le cache d'embeddings (piece_index),
+leads.csv (order) et la compaction des archives (lead_export).
+Sans fcntl (Windows : un seul processus), le verrou est toujours accordé.
+"""
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl  # POSIX
+except ImportError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    shared : lecteurs en parallèle, un écrivain seul (sinon exclusif).
+    blocking=False : n'attend pas, renvoie False si le verrou est déjà pris.
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fh:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fh, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
@@ -1,10 +1,16 @@
 import csv
 import os
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, Any
 
-LEADS_CSV = os.path.join("data", "leads.csv")
+import config
+from locks import file_lock
+
+# protège l'append contre la rotation (lead_export), entre threads du processus
+LEADS_LOCK = threading.Lock()
 
 FIELDS = [
     "lead_id",
@@ -21,10 +27,23 @@ FIELDS = [
     "status"
 ]
 
+def leads_csv() -> str:
+    return config.get().leads_csv
+
+@contextmanager
+def leads_lock():
+    """
+    Verrou exclusif sur leads.csv : threads (LEADS_LOCK) + processus
+    (flock sur leads.csv.lock). Tous les écrivains passent par là.
+    """
+    with LEADS_LOCK, file_lock(leads_csv() + ".lock"):
+        yield
+
 def ensure_file():
-    os.makedirs("data", exist_ok=True)
-    if not os.path.exists(LEADS_CSV):
-        with open(LEADS_CSV, "w", newline="", encoding="utf-8") as f:
+    path = leads_csv()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if not os.path.exists(path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
             w = csv.DictWriter(f, fieldnames=FIELDS)
             w.writeheader()
 
@@ -32,7 +51,6 @@ def save_lead(slots: Dict[str, Any]) -> str:
     """
     Enregistre une demande et retourne lead_id
     """
-    ensure_file()
     lead_id = uuid.uuid4().hex[:10]  # court et unique
 
     row = {
@@ -50,8 +68,10 @@ def save_lead(slots: Dict[str, Any]) -> str:
         "status": "NEW"
     }
 
-    with open(LEADS_CSV, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=FIELDS)
-        w.writerow(row)
+    with leads_lock():
+        ensure_file()
+        with open(leads_csv(), "a", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS)
+            w.writerow(row)
 
     return lead_id
@@ -0,0 +1,287 @@
+# piece_index.py
+"""
+Index sémantique : texte libre du client -> pièce du catalogue.
+
+"turbocompresseur", "pads de frein", fautes de frappe... que parse_piece
+ne reconnaît pas sont résolus par similarité cosinus entre embeddings
+(modèle CPU léger via l'API embed d'Ollama, config.embed_model).
+
+- index : une matrice NumPy (float32, lignes normalisées) des noms de pièces
+  du catalogue + alias connus ; top-k vectorisé (un seul produit matriciel) ;
+- cache : embedding de chaque phrase déjà vue, en mémoire et sur disque
+  (config.embed_cache_path) => la plupart des recherches n'appellent pas le modèle ;
+- construction en fond (engine.warmup, ou python piece_index.py --build),
+  embeds par lots de BATCH_SIZE : lookup() renvoie None tant que l'index
+  n'est pas prêt, et un échec n'est pas retenté par les requêtes.
+
+NumPy est optionnel : sans lui (ou sans serveur), lookup() renvoie None.
+"""
+import atexit
+import os
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+import llm_client
+from locks import file_lock
+from pieces import CATALOG
+from slot_parser import PIECES_KNOWN
+
+Embedder = Callable[[List[str]], List[List[float]]]
+
+BATCH_SIZE = 64  # phrases par appel /api/embed à la construction
+
+
+def _phrase(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def ollama_embedder(texts: List[str]) -> List[List[float]]:
+    cfg = config.get()
+    return llm_client.embed(cfg.embed_model, texts, timeout=cfg.embed_timeout_sec)
+
+
+class EmbeddingCache:
+    """phrase -> vecteur, persisté en .npz (modèle + clés + matrice)."""
+
+    def __init__(self, path: str, max_entries: int, model: str) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.model = model
+        self._vectors: Dict[str, object] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._saving = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _read_file(self) -> Dict[str, object]:
+        import numpy as np
+
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            if str(data["model"]) != self.model:
+                return {}  # vecteurs d'un autre modèle : inutilisables
+            return {str(k): v for k, v in zip(data["keys"], data["vectors"])}
+        except Exception:
+            # cache illisible (tronqué : BadZipFile, EOFError...) : on repart de zéro
+            return {}
+
+    def _load(self) -> None:
+        self._vectors = self._read_file()
+
+    def save(self) -> None:
+        """
+        Fusionne avec le fichier (phrases des autres workers) puis le réécrit,
+        sous verrou fichier et via un temporaire propre au processus.
+        """
+        import numpy as np
+
+        with self._saving:
+            with self._lock:
+                if not self._dirty or not self._vectors:
+                    return
+                self._dirty = 0
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with file_lock(self.path + ".lock"):  # un seul worker écrit le cache à la fois
+                on_disk = self._read_file()
+                with self._lock:
+                    for k, v in on_disk.items():
+                        if k not in self._vectors and len(self._vectors) < self.max_entries:
+                            self._vectors[k] = v
+                    keys = list(self._vectors)
+                    vectors = [self._vectors[k] for k in keys]
+                tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+                np.savez(tmp, model=np.array(self.model), keys=np.array(keys), vectors=np.stack(vectors))
+                os.replace(tmp, self.path)
+
+    def _save_in_background(self) -> None:
+        # jamais sur le chemin de la requête : l'écriture de tout le cache prend ~1 s à 100k phrases
+        if not self._saving.locked():
+            threading.Thread(target=self.save, name="embed-cache-save", daemon=True).start()
+
+    def get_many(self, phrases: Sequence[str], embedder: Embedder) -> List[object]:
+        import numpy as np
+
+        with self._lock:
+            missing = [p for p in dict.fromkeys(phrases) if p not in self._vectors]
+            self.hits += len(phrases) - len(missing)
+            self.misses += len(missing)
+        fresh: Dict[str, object] = {}
+        if missing:
+            vecs = embedder(missing)
+            if len(vecs) != len(missing):
+                raise ValueError("réponse embed incomplète")
+            fresh = {p: np.asarray(v, dtype=np.float32) for p, v in zip(missing, vecs)}
+            with self._lock:
+                for p, v in fresh.items():
+                    if len(self._vectors) < self.max_entries:
+                        self._vectors[p] = v
+                        self._dirty += 1
+            if self._dirty >= 32:
+                self._save_in_background()
+        with self._lock:
+            return [fresh[p] if p in fresh else self._vectors[p] for p in phrases]
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self._vectors
+
+
+class PieceIndex:
+    def __init__(self, labels: List[str], targets: List[str], matrix) -> None:
+        import numpy as np
+
+        self.labels = labels      # texte indexé (nom catalogue ou alias)
+        self.targets = targets    # pièce canonique correspondante
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    @classmethod
+    def build(cls, entries: Dict[str, str], cache: EmbeddingCache, embedder: Embedder) -> "PieceIndex":
+        import numpy as np
+
+        labels = list(entries)
+        phrases = [_phrase(x) for x in labels]
+        vectors: List[object] = []
+        for i in range(0, len(phrases), BATCH_SIZE):
+            vectors += cache.get_many(phrases[i:i + BATCH_SIZE], embedder)
+        return cls(labels, [entries[x] for x in labels], np.stack(vectors))
+
+    def top_k(self, vector, k: int = 3) -> List[Tuple[str, str, float]]:
+        """[(pièce, texte indexé, score cosinus)] triés par score décroissant."""
+        import numpy as np
+
+        v = np.asarray(vector, dtype=np.float32)
+        v = v / max(float(np.linalg.norm(v)), 1e-12)
+        scores = self.matrix @ v
+        k = min(k, len(scores))
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(self.targets[i], self.labels[i], float(scores[i])) for i in idx]
+
+
+def catalog_entries() -> Dict[str, str]:
+    """Texte à indexer -> pièce canonique (noms du stock + alias connus)."""
+    entries = {k: v for k, v in PIECES_KNOWN.items()}
+    for name in sorted(CATALOG.snapshot().piece_names):
+        entries.setdefault(name, name.lower())
+    return entries
+
+
+# ---------- INSTANCE DU PROCESSUS ----------
+
+_lock = threading.Lock()
+_cache: Optional[EmbeddingCache] = None
+_index: Optional[PieceIndex] = None
+_index_key: Optional[tuple] = None
+_building: Optional[threading.Thread] = None
+_failed_key: Optional[tuple] = None   # échec mémorisé : pas de nouvel essai pour ces noms
+
+
+def _current_key() -> tuple:
+    # ne reconstruit que si l'ensemble des noms de pièces change (pas pour un prix / un stock)
+    return (config.get().embed_model, CATALOG.snapshot().piece_names)
+
+
+def _get_cache() -> EmbeddingCache:
+    global _cache
+    cfg = config.get()
+    with _lock:
+        if _cache is None or (_cache.path, _cache.model) != (cfg.embed_cache_path, cfg.embed_model):
+            if _cache is not None:
+                _cache.save()
+            _cache = EmbeddingCache(cfg.embed_cache_path, cfg.embed_cache_max_entries, cfg.embed_model)
+        return _cache
+
+
+def build(embedder: Optional[Embedder] = None) -> bool:
+    """Construit l'index (bloquant). False si NumPy / le serveur manque : échec mémorisé."""
+    global _index, _index_key, _failed_key
+    key = _current_key()
+    try:
+        index = PieceIndex.build(catalog_entries(), _get_cache(), embedder or ollama_embedder)
+    except Exception as e:
+        with _lock:
+            _failed_key = key
+        print("piece_index: construction impossible:", e, file=sys.stderr)
+        return False
+    with _lock:
+        _index, _index_key, _failed_key = index, key, None
+    return True
+
+
+def start_build() -> Optional[threading.Thread]:
+    """Lance build() en fond si l'index manque ou est périmé (jamais deux à la fois)."""
+    global _building
+    key = _current_key()
+    with _lock:
+        if _index_key == key or _failed_key == key or (_building is not None and _building.is_alive()):
+            return None
+        _building = threading.Thread(target=build, name="piece-index-build", daemon=True)
+        _building.start()
+        return _building
+
+
+def preload() -> None:
+    """Charge le cache disque et l'index sans appeler le modèle si tout est en cache."""
+    cache = _get_cache()
+    if all(_phrase(x) in cache for x in catalog_entries()):
+        build()
+
+
+def lookup(text: str, embedder: Optional[Embedder] = None) -> Optional[str]:
+    """
+    Pièce canonique la plus proche, ou None (score trop bas, index pas encore prêt,
+    NumPy ou serveur absent). L'index n'est jamais construit sur le chemin de la requête.
+    """
+    embedder = embedder or ollama_embedder  # lu à l'appel : replay.py le remplace
+    cfg = config.get()
+    phrase = _phrase(text)
+    if not cfg.piece_semantic_enabled or not phrase:
+        return None
+    start_build()  # catalogue changé : nouvel index en fond, l'ancien sert en attendant
+    cache, index = _cache, _index
+    if cache is None or index is None:
+        return None
+    try:
+        [vec] = cache.get_many([phrase], embedder)
+    except Exception:
+        return None
+    best = index.top_k(vec, k=1)
+    if best and best[0][2] >= cfg.embed_min_score:
+        return best[0][0]
+    return None
+
+
+def stats() -> dict:
+    if _cache is None:
+        return {}
+    return {
+        "cache_entries": len(_cache), "hits": _cache.hits, "misses": _cache.misses,
+        "ready": _index is not None, "failed": _failed_key is not None,
+    }
+
+
+def save_cache() -> None:
+    if _cache is not None:
+        _cache.save()
+
+
+atexit.register(save_cache)
+
+
+if __name__ == "__main__":
+    # préremplit le cache disque avant un déploiement : python piece_index.py --build
+    if sys.argv[1:] != ["--build"]:
+        sys.exit("usage: python piece_index.py --build")
+    ok = build()
+    save_cache()
+    print(stats())
+    sys.exit(0 if ok else 1)
@@ -1,7 +1,225 @@
 import csv
-from typing import Union
+import json
+import math
+import os
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+import config
+from locks import file_lock
+
+Key = Tuple[str, str, str, str]
+
+FIELDS = ["piece", "marque", "modele", "annee", "prix", "stock"]
+KEY_FIELDS = ["piece", "marque", "modele", "annee"]
+
+
+def make_key(piece: str, marque: str, modele: str, annee: Union[int, str]) -> Key:
+    return (
+        str(piece).strip().lower(),
+        str(marque).strip().lower(),
+        str(modele).strip().lower(),
+        str(annee).strip(),   # 👈 accepte int OU str
+    )
+
+
+class CatalogSnapshot:
+    """Vue immuable du stock : une recherche ne voit jamais un état à moitié mis à jour."""
+
+    def __init__(self, rows: Dict[Key, dict], version: int) -> None:
+        self.rows = rows
+        self.version = version
+        self.piece_names: FrozenSet[str] = frozenset(r["piece"].strip() for r in rows.values())
+
+
+class CatalogIndex:
+    """
+    Index du stock en mémoire : (piece, marque, modele, annee) -> ligne CSV.
+
+    Sur disque : stock.csv (base) + stock.csv.deltas (journal NDJSON, un delta par ligne).
+    - apply_deltas ajoute au journal : pas de réécriture du CSV à chaque lot ;
+    - les autres workers relisent seulement la fin du journal (depuis leur offset) ;
+    - au-delà de config.stock_delta_compact_bytes, le journal est fusionné dans
+      stock.csv (réécrit atomiquement) puis vidé : seul ce cas recharge tout le CSV.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snap = CatalogSnapshot({}, 0)
+        self._path: Optional[str] = None
+        self._base_id: Optional[tuple] = None   # (inode, mtime_ns) de stock.csv
+        self._log_offset = 0                     # octets du journal déjà appliqués
+
+    @staticmethod
+    def _read(path: str) -> Dict[Key, dict]:
+        rows: Dict[Key, dict] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                # première ligne gagnante (comme l'ancien scan séquentiel)
+                rows.setdefault(make_key(row["piece"], row["marque"], row["modele"], row["annee"]), row)
+        return rows
+
+    @staticmethod
+    def _file_id(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    @staticmethod
+    def _log_size(path: str) -> int:
+        try:
+            return os.path.getsize(path + ".deltas")
+        except FileNotFoundError:
+            return 0
+
+    def _stale(self, path: str) -> bool:
+        return (
+            path != self._path
+            or self._file_id(path) != self._base_id
+            or self._log_size(path) != self._log_offset
+        )
+
+    def _refresh_locked(self, path: str) -> None:
+        """Rattrape l'état disque (appelé sous self._lock et le verrou fichier)."""
+        if not self._stale(path):
+            return
+        base_id = self._file_id(path)
+        if path != self._path or base_id != self._base_id or self._log_size(path) < self._log_offset:
+            rows, offset = self._read(path), 0  # base changée (compaction) : rechargement complet
+        else:
+            rows, offset = dict(self._snap.rows), self._log_offset
+        offset = self._replay_log(path, rows, offset)
+        self._snap = CatalogSnapshot(rows, self._snap.version + 1)
+        self._path, self._base_id, self._log_offset = path, base_id, offset
+
+    @staticmethod
+    def _replay_log(path: str, rows: Dict[Key, dict], offset: int) -> int:
+        try:
+            with open(path + ".deltas", "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        complete = data[: data.rfind(b"\n") + 1]  # jamais une ligne à moitié écrite
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                _apply(rows, [json.loads(line)])
+        return offset + len(complete)
+
+    def snapshot(self) -> CatalogSnapshot:
+        path = config.get().stock_csv
+        if self._stale(path):
+            with self._lock, file_lock(path + ".lock", shared=True):
+                self._refresh_locked(path)
+        return self._snap
+
+    def rows(self) -> Dict[Key, dict]:
+        return self.snapshot().rows
+
+    def lookup(self, piece: str, marque: str, modele: str, annee: Union[int, str]) -> Optional[dict]:
+        return self.snapshot().rows.get(make_key(piece, marque, modele, annee))
+
+    # ---------- DELTAS ----------
+
+    def apply_deltas(self, deltas: Iterable[dict]) -> dict:
+        """
+        Applique un lot de deltas de façon atomique :
+        {"op": "upsert", "piece", "marque", "modele", "annee", ["prix"], ["stock"]}
+        {"op": "delete", "piece", "marque", "modele", "annee"}
+        Nouvelle version en mémoire + lot ajouté au journal disque.
+        Lève ValueError (rien n'est appliqué) si un delta est invalide.
+        """
+        deltas = [_validate(i, d) for i, d in enumerate(deltas)]
+
+        cfg = config.get()
+        path = cfg.stock_csv
+        with self._lock, file_lock(path + ".lock"):
+            self._refresh_locked(path)  # part du dernier état disque (autres workers)
+            rows = dict(self._snap.rows)
+            upserts, deletes = _apply(rows, deltas, strict=True)
+
+            if deltas:
+                lines = "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in deltas)
+                with open(path + ".deltas", "a", encoding="utf-8") as f:
+                    f.write(lines)
+            self._snap = CatalogSnapshot(rows, self._snap.version + 1)
+            self._log_offset = self._log_size(path)
+
+            if self._log_offset > cfg.stock_delta_compact_bytes:
+                self._compact_locked(path)
+            version = self._snap.version  # lu sous verrou : pas celle d'un lot suivant
+
+        return {"version": version, "upserts": upserts, "deletes": deletes, "rows": len(rows)}
+
+    def compact(self) -> None:
+        """Fusionne le journal dans stock.csv et le vide."""
+        path = config.get().stock_csv
+        with self._lock, file_lock(path + ".lock"):
+            self._refresh_locked(path)
+            self._compact_locked(path)
+
+    def _compact_locked(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(self._snap.rows.values())
+        os.replace(tmp, path)
+        open(path + ".deltas", "w").close()
+        self._base_id, self._log_offset = self._file_id(path), 0
+
+
+def _validate(i: int, d: dict) -> dict:
+    if not isinstance(d, dict):
+        raise ValueError(f"delta {i}: objet attendu")
+    op = d.get("op", "upsert")
+    if op not in ("upsert", "delete"):
+        raise ValueError(f"delta {i}: op inconnue {op!r}")
+    missing = [k for k in KEY_FIELDS if str(d.get(k) or "").strip() == ""]
+    if missing:
+        raise ValueError(f"delta {i}: champs manquants {missing}")
+    out = {"op": op, **{k: str(d[k]).strip() for k in KEY_FIELDS}}
+    if op == "upsert":
+        try:
+            if d.get("prix") is not None:
+                prix = float(d["prix"])
+                if not math.isfinite(prix) or prix < 0:  # NaN, inf, négatif
+                    raise ValueError
+                out["prix"] = str(d["prix"]).strip()
+            if d.get("stock") is not None:
+                stock = int(str(d["stock"]).strip())
+                if stock < 0:
+                    raise ValueError
+                out["stock"] = str(stock)
+        except ValueError:
+            raise ValueError(f"delta {i}: prix / stock doivent être des nombres finis >= 0")
+    return out
+
+
+def _apply(rows: Dict[Key, dict], deltas: List[dict], strict: bool = False) -> Tuple[int, int]:
+    """Applique des deltas validés sur rows (copie de travail). strict : nouvelle ligne => prix + stock."""
+    upserts = deletes = 0
+    for i, d in enumerate(deltas):
+        key = make_key(d["piece"], d["marque"], d["modele"], d["annee"])
+        if d.get("op", "upsert") == "delete":
+            deletes += rows.pop(key, None) is not None
+            continue
+        old = rows.get(key)
+        if old is None and strict and ("prix" not in d or "stock" not in d):
+            raise ValueError(f"delta {i}: nouvelle pièce sans prix / stock")
+        row = dict(old) if old else {f: "" for f in FIELDS}
+        for f in FIELDS:
+            if f in d:
+                row[f] = d[f]
+        rows[key] = row  # nouvelle ligne : les anciennes vues restent intactes
+        upserts += 1
+    return upserts, deletes
+
+
+CATALOG = CatalogIndex()
 
-CSV_PATH = "data/stock.csv"
 
 def rechercher_piece(
     piece: str,
@@ -9,19 +227,4 @@ def rechercher_piece(
     modele: str,
     annee: Union[int, str]   # 👈 accepte int OU str
 ):
-    piece = piece.strip().lower()
-    marque = marque.strip().lower()
-    modele = modele.strip().lower()
-    annee = str(annee).strip()   # 👈 normalisation OK
-
-    with open(CSV_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if (
-                row["piece"].strip().lower() == piece
-                and row["marque"].strip().lower() == marque
-                and row["modele"].strip().lower() == modele
-                and row["annee"].strip() == annee
-            ):
-                return row
-    return None
+    return CATALOG.lookup(piece, marque, modele, annee)
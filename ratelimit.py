@@ -0,0 +1,198 @@
+# ratelimit.py
+"""
+Limitation de débit sur /chat (seaux à jetons), pour protéger le serveur LLM.
+
+Deux budgets, chacun par session ET par IP (config.ratelimit_budgets,
+[jetons par minute, rafale]) :
+- "turn" : tout message. Épuisé => 429 immédiat, avant tout travail ;
+- "llm"  : tours qui appellent le modèle. Épuisé => le tour est quand même
+  servi, mais sans LLM (questions fixes, voir engine.deterministic).
+
+État des seaux :
+- "memory" : dict par processus (chaque worker gunicorn a ses propres seaux) ;
+- "sqlite" : fichier partagé par tous les workers (config.ratelimit_sqlite_path).
+Une erreur SQLite laisse passer la requête (compteur "store_errors").
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+
+# (clé, jetons par seconde, rafale)
+Spec = Tuple[str, float, float]
+
+ALLOW_LLM = "llm"
+ALLOW_DETERMINISTIC = "deterministic"
+REJECT = "reject"
+
+
+def _refill(tokens: float, ts: float, rate: float, burst: float, now: float) -> float:
+    return min(burst, tokens + max(0.0, now - ts) * rate)
+
+
+def _retry_after(tokens: float, rate: float) -> float:
+    return (1.0 - tokens) / rate if rate > 0 else 60.0
+
+
+class MemoryStore:
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def take_many(self, specs: Sequence[Spec], now: Optional[float] = None) -> Tuple[bool, float]:
+        """Prend 1 jeton dans chaque seau, ou aucun si l'un d'eux est vide (attente en s)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            levels = []
+            for key, rate, burst in specs:
+                b = self._buckets.get(key)
+                levels.append(burst if b is None else _refill(b[0], b[1], rate, burst, now))
+            wait = max((_retry_after(t, s[1]) for t, s in zip(levels, specs) if t < 1.0), default=0.0)
+            if wait:
+                return False, wait
+            for (key, _, _), t in zip(specs, levels):
+                self._buckets[key] = [t - 1.0, now]
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return True, 0.0
+
+    def _prune(self, now: float) -> None:
+        # seaux inactifs depuis 10 min : forcément pleins, inutile de les garder
+        for key in [k for k, (_, ts) in self._buckets.items() if now - ts > 600]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SqliteStore:
+    """Seaux partagés entre processus (une transaction IMMEDIATE par requête)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, ts REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # une connexion par thread et par processus (jamais héritée d'un fork)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def take_many(self, specs: Sequence[Spec], now: Optional[float] = None) -> Tuple[bool, float]:
+        now = time.time() if now is None else now  # horloge commune aux workers
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for key, rate, burst in specs:
+                row = db.execute("SELECT tokens, ts FROM buckets WHERE key = ?", (key,)).fetchone()
+                levels.append(burst if row is None else _refill(row[0], row[1], rate, burst, now))
+            wait = max((_retry_after(t, s[1]) for t, s in zip(levels, specs) if t < 1.0), default=0.0)
+            if not wait:
+                db.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, ts) VALUES (?, ?, ?)",
+                    [(s[0], t - 1.0, now) for s, t in zip(specs, levels)],
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return (False, wait) if wait else (True, 0.0)
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, store, budgets: Dict[str, List[float]]) -> None:
+        self.store = store
+        self.configure(budgets)
+        self._lock = threading.Lock()
+        self.counters = {ALLOW_LLM: 0, ALLOW_DETERMINISTIC: 0, REJECT: 0, "too_long": 0, "store_errors": 0}
+
+    def configure(self, budgets: Dict[str, List[float]]) -> None:
+        # [par minute, rafale] -> (par seconde, rafale)
+        self.budgets = {name: (float(v[0]) / 60.0, float(v[1])) for name, v in budgets.items()}
+
+    def _specs(self, kind: str, session: str, ip: str) -> List[Spec]:
+        specs = []
+        for scope, ident in (("session", session), ("ip", ip)):
+            rate, burst = self.budgets[f"{kind}_{scope}"]
+            specs.append((f"{kind}:{scope}:{ident}", rate, burst))
+        return specs
+
+    def _take(self, specs: List[Spec]) -> Tuple[bool, float]:
+        try:
+            return self.store.take_many(specs)
+        except sqlite3.Error:
+            self.count("store_errors")
+            return True, 0.0
+
+    def check(self, session: str, ip: str) -> Tuple[str, float]:
+        """(décision, attente en s) : ALLOW_LLM, ALLOW_DETERMINISTIC ou REJECT."""
+        ok, wait = self._take(self._specs("turn", session, ip))
+        if not ok:
+            decision = REJECT
+        elif self._take(self._specs("llm", session, ip))[0]:
+            decision, wait = ALLOW_LLM, 0.0
+        else:
+            decision, wait = ALLOW_DETERMINISTIC, 0.0
+        self.count(decision)
+        return decision, wait
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.counters)
+        try:
+            out["buckets"] = len(self.store)
+        except sqlite3.Error:
+            pass
+        return out
+
+
+# ---------- INSTANCE DU PROCESSUS ----------
+
+_limiter: Optional[RateLimiter] = None
+_store_key: Optional[tuple] = None
+_glock = threading.Lock()
+
+
+def _make_store(cfg: config.Config):
+    if cfg.ratelimit_backend == "sqlite":
+        return SqliteStore(cfg.ratelimit_sqlite_path)
+    return MemoryStore()
+
+
+def _on_reload(cfg: config.Config) -> None:
+    global _store_key
+    with _glock:
+        key = (cfg.ratelimit_backend, cfg.ratelimit_sqlite_path)
+        if key != _store_key:
+            _limiter.store, _store_key = _make_store(cfg), key
+        _limiter.configure(cfg.ratelimit_budgets)
+
+
+def get_limiter() -> RateLimiter:
+    global _limiter, _store_key
+    with _glock:
+        if _limiter is None:
+            cfg = config.get()
+            _limiter = RateLimiter(_make_store(cfg), cfg.ratelimit_budgets)
+            _store_key = (cfg.ratelimit_backend, cfg.ratelimit_sqlite_path)
+            config.on_reload(_on_reload)
+        return _limiter
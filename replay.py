@@ -0,0 +1,134 @@
+# replay.py
+"""
+Rejoue des transcripts enregistrés à travers process_message.
+
+    python replay.py [chemins...] [--real] [--session ID]
+
+- chemins : fichiers .ndjson ou dossiers (défaut: dossier transcripts_dir de la config) ;
+- par défaut le modèle est simulé (stub) : il renvoie la sortie enregistrée
+  du tour, ce qui isole les régressions du code (slots, étapes) et mesure
+  le temps hors LLM ; --real appelle le vrai serveur Ollama ;
+- en mode stub, l'index sémantique n'appelle pas non plus /api/embed :
+  seules les phrases déjà dans le cache local d'embeddings sont résolues ;
+- save_lead est toujours simulé : un replay ne crée jamais de lead.
+
+Affiche, par session, les écarts de slots / réponses et compare les timings.
+"""
+import argparse
+import copy
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+import assistant_slots
+import config
+import engine
+import piece_index
+import transcript
+
+SLOT_KEYS = ["motif", "immat", "chassis", "piece", "type_piece", "marque", "modele", "annee", "coordonnees", "_step"]
+
+
+class StubModel:
+    """Remplace engine.chat : renvoie les sorties enregistrées du tour courant, dans l'ordre."""
+
+    def __init__(self) -> None:
+        self.outputs: List[str] = []
+
+    def load(self, record: dict) -> None:
+        self.outputs = [c.get("output") or "" for c in record.get("llm", [])]
+
+    def __call__(self, messages, num_predict, stop=None, timeout=None):
+        out = self.outputs.pop(0) if self.outputs else "OK."
+        return out, ""
+
+
+def offline_embedder(texts):
+    """Remplace piece_index.ollama_embedder : pas de réseau (phrase hors cache => pas de pièce)."""
+    raise RuntimeError("replay: embedder hors ligne")
+
+
+def group_sessions(records) -> Dict[str, List[dict]]:
+    sessions: Dict[str, List[dict]] = defaultdict(list)
+    for r in records:
+        sessions[r["session"]].append(r)
+    for turns in sessions.values():
+        turns.sort(key=lambda r: r["turn"])
+    return sessions
+
+
+def replay_session(turns: List[dict], stub: StubModel = None) -> dict:
+    slots = copy.deepcopy(turns[0].get("slots_before") or assistant_slots.new_slots())
+    diffs = []
+    rec_total = new_total = 0.0
+
+    for rec in turns:
+        if stub is not None:
+            stub.load(rec)
+        # save_lead simulé : rend le lead_id enregistré (même lien de checkout)
+        lead_id = (rec.get("slots") or {}).get("_lead_id") or "replay"
+        assistant_slots.save_lead = lambda _slots, _id=lead_id: _id
+
+        with transcript.tracing() as tr:
+            answer, slots = assistant_slots.process_message(rec["text"], slots)
+        new_ms = tr.total_ms()
+        rec_ms = (rec.get("timings_ms") or {}).get("total", 0.0)
+        rec_total += rec_ms
+        new_total += new_ms
+
+        expected = rec.get("slots") or {}
+        bad = {k: (expected.get(k), slots.get(k)) for k in SLOT_KEYS if expected.get(k) != slots.get(k)}
+        if bad or (stub is not None and answer != rec.get("answer")):
+            diffs.append({"turn": rec["turn"], "text": rec["text"], "slots": bad,
+                          "answer": (rec.get("answer"), answer)})
+
+        print(f"  tour {rec['turn']:>2} : {rec_ms:8.1f} ms -> {new_ms:8.1f} ms  {rec['text'][:50]!r}")
+
+    return {"diffs": diffs, "recorded_ms": rec_total, "replay_ms": new_total}
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Rejoue des transcripts à travers process_message.")
+    p.add_argument("paths", nargs="*")
+    p.add_argument("--real", action="store_true", help="appelle le vrai modèle (défaut: stub)")
+    p.add_argument("--session", help="ne rejoue qu'une session")
+    args = p.parse_args(argv)
+
+    paths = args.paths or [config.get().transcripts_dir]
+    sessions = group_sessions(transcript.read_records(paths))
+    if args.session:
+        sessions = {k: v for k, v in sessions.items() if k == args.session}
+    if not sessions:
+        print("aucun transcript trouvé")
+        return 1
+
+    stub = None
+    if not args.real:
+        stub = StubModel()
+        engine.chat = stub
+        piece_index.ollama_embedder = offline_embedder
+    piece_index.build()  # index prêt avant le 1er tour (pas de construction en fond pendant la relecture)
+
+    n_diff = 0
+    rec_sum = new_sum = 0.0
+    for sid, turns in sessions.items():
+        print(f"session {sid} ({len(turns)} tours)")
+        res = replay_session(turns, stub)
+        rec_sum += res["recorded_ms"]
+        new_sum += res["replay_ms"]
+        for d in res["diffs"]:
+            n_diff += 1
+            print(f"  ≠ tour {d['turn']} {d['text']!r}")
+            for k, (old, new) in d["slots"].items():
+                print(f"      {k}: {old!r} -> {new!r}")
+            if d["answer"][0] != d["answer"][1]:
+                print(f"      réponse: {d['answer'][0]!r} -> {d['answer'][1]!r}")
+
+    print(f"\n{len(sessions)} session(s), {n_diff} tour(s) différent(s), "
+          f"temps total {rec_sum:.1f} ms enregistré -> {new_sum:.1f} ms rejoué"
+          + (" (modèle simulé)" if stub else ""))
+    return 1 if n_diff else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# slot_parser.py
+"""
+Parseur déterministe multi-slots.
+
+Un seul message libre ("commande turbo neuf Renault Clio 4 2017 0612345678")
+remplit tous les slots reconnus en un tour, sans appel LLM.
+Toutes les regex sont compilées une fois à l'import.
+"""
+import re
+from typing import Dict, Optional
+
+KNOWN_BRANDS = [
+    "Renault", "Volkswagen", "Peugeot", "Dacia", "Citroen",
+    "Toyota", "Ford", "Hyundai", "Kia", "BMW", "Mercedes",
+    "Fiat", "Nissan", "Opel", "Audi", "Skoda", "Seat",
+]
+
+# modèle -> marque (permet de déduire la marque depuis "Clio 4")
+KNOWN_MODELS = {
+    "Clio 4": "Renault", "Clio 5": "Renault", "Megane": "Renault", "Kangoo": "Renault",
+    "Golf 6": "Volkswagen", "Golf 7": "Volkswagen", "Polo": "Volkswagen",
+    "208": "Peugeot", "308": "Peugeot", "3008": "Peugeot", "Partner": "Peugeot",
+    "Logan": "Dacia", "Sandero": "Dacia", "Duster": "Dacia",
+    "Berlingo": "Citroen", "C3": "Citroen",
+    "Yaris": "Toyota", "Corolla": "Toyota", "Hilux": "Toyota",
+    "Fiesta": "Ford", "Focus": "Ford",
+    "Accent": "Hyundai", "i10": "Hyundai", "Picanto": "Kia",
+}
+
+PIECES_KNOWN = {
+    "turbo": "turbo",
+    "filtre huile": "filtre huile",
+    "filtre d'huile": "filtre huile",
+    "filtre a huile": "filtre huile",
+    "filtre à huile": "filtre huile",
+    "plaquettes frein": "plaquettes frein",
+    "plaquettes de frein": "plaquettes frein",
+    "plaquettes": "plaquettes frein",
+    "plaquette": "plaquettes frein",
+    "disques": "disques",
+}
+
+TYPE_WORDS = ["neuf", "occasion", "original", "adaptable", "avant", "arrière", "arriere"]
+
+
+def _alternation(words) -> str:
+    # plus long d'abord : "plaquettes frein" avant "plaquettes"
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# ---------- REGEX PRÉCOMPILÉES ----------
+
+RE_MOTIF_SUIVI = re.compile(r"\bsuivi\b", re.I)
+RE_MOTIF_SAV = re.compile(r"\bsav\b", re.I)
+RE_MOTIF_COMMANDE = re.compile(r"\bcommande[rsz]?\b", re.I)
+
+# VIN : 17 caractères, sans I / O / Q
+RE_VIN = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b", re.I)
+# Maroc : 12345-A-6 / 12345 | ب | 6 ; France (SIV) : AB-123-CD
+RE_IMMAT_MA = re.compile(r"\b\d{1,6}\s*[-|/]\s*[A-Za-z؀-ۿ]{1,2}\s*[-|/]\s*\d{1,2}\b")
+RE_IMMAT_FR = re.compile(r"\b[A-Z]{2}-?\d{3}-?[A-Z]{2}\b", re.I)
+
+# pas de \b final : "turbocompresseur" => turbo
+RE_PIECE = re.compile(rf"\b({_alternation(PIECES_KNOWN)})", re.I)
+RE_TYPE = re.compile(rf"\b({_alternation(TYPE_WORDS)})\b", re.I)
+RE_BRAND = re.compile(rf"\b({_alternation(KNOWN_BRANDS)})\b", re.I)
+RE_MODEL = re.compile(rf"\b({_alternation(KNOWN_MODELS)})\b", re.I)
+RE_MODEL_CLIO = re.compile(r"\bclio\s*(\d)\b", re.I)
+# génération après un modèle sans chiffre : "Megane 3", "Polo 5" (pas "Polo 2015")
+RE_GENERATION = re.compile(r"\s*([1-9])\b")
+RE_YEAR = re.compile(r"\b(19[89]\d|20[0-3]\d)\b")
+
+RE_PHONE = re.compile(r"(?<![\w+])(?:\+212\s?|0)\d(?:[\s.-]?\d{2}){4}\b")
+RE_EMAIL = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+
+_BRANDS_LOWER = {b.lower(): b for b in KNOWN_BRANDS}
+_MODELS_LOWER = {m.lower(): m for m in KNOWN_MODELS}
+_PIECES_LOWER = {k.lower(): v for k, v in PIECES_KNOWN.items()}
+
+
+# ---------- PARSE ----------
+
+def parse_motif(text: str) -> Optional[str]:
+    if RE_MOTIF_SUIVI.search(text):
+        return "suivi"
+    if RE_MOTIF_SAV.search(text):
+        return "sav"
+    if RE_MOTIF_COMMANDE.search(text):
+        return "commande"
+    return None
+
+
+def parse_vin(text: str) -> Optional[str]:
+    for m in RE_VIN.finditer(text):
+        vin = m.group(0).upper()
+        # un VIN mélange lettres et chiffres
+        if any(c.isdigit() for c in vin) and any(c.isalpha() for c in vin):
+            return vin
+    return None
+
+
+def _immat_match(text: str):
+    return RE_IMMAT_MA.search(text) or RE_IMMAT_FR.search(text)
+
+
+def parse_immat(text: str) -> Optional[str]:
+    m = _immat_match(text)
+    if m is None:
+        return None
+    if m.re is RE_IMMAT_MA:
+        return re.sub(r"\s*[-|/]\s*", "-", m.group(0))
+    s = m.group(0).upper().replace("-", "")
+    return f"{s[:2]}-{s[2:5]}-{s[5:]}"
+
+
+def parse_piece(text: str) -> Optional[str]:
+    m = RE_PIECE.search(text)
+    return _PIECES_LOWER[m.group(1).lower()] if m else None
+
+
+def parse_year(text: str) -> Optional[int]:
+    m = RE_YEAR.search(text)
+    return int(m.group(1)) if m else None
+
+
+def parse_contact(text: str) -> Optional[str]:
+    found = [m.group(0) for m in RE_PHONE.finditer(text)]
+    found += [m.group(0) for m in RE_EMAIL.finditer(text)]
+    return " | ".join(found) if found else None
+
+
+def parse_slots(text: str) -> Dict[str, object]:
+    """
+    Retourne {slot: valeur} pour chaque slot reconnu dans le message.
+    Les slots absents ne sont pas dans le dict.
+    """
+    out: Dict[str, object] = {}
+    if not text:
+        return out
+
+    motif = parse_motif(text)
+    if motif:
+        out["motif"] = motif
+
+    # le VIN d'abord : sinon ses chiffres peuvent ressembler à autre chose
+    vin = parse_vin(text)
+    if vin:
+        out["chassis"] = vin
+        text = text.replace(vin, " ").replace(vin.lower(), " ")
+
+    # idem pour la plaque : "AB-208-CD" n'est pas une 208, "2015-A-6" pas une année
+    m = _immat_match(text)
+    if m:
+        out["immat"] = parse_immat(m.group(0))
+        text = text.replace(m.group(0), " ")
+
+    contact = parse_contact(text)
+    if contact:
+        out["coordonnees"] = contact
+        text = RE_EMAIL.sub(" ", RE_PHONE.sub(" ", text))
+
+    piece = parse_piece(text)
+    if piece:
+        out["piece"] = piece
+
+    types = [w.lower() for w in RE_TYPE.findall(text)]
+    if types:
+        out["type_piece"] = " ".join(dict.fromkeys(types))
+
+    m = RE_MODEL.search(text)
+    if m:
+        model = _MODELS_LOWER[m.group(1).lower()]
+        out["marque"] = KNOWN_MODELS[model]
+        g = RE_GENERATION.match(text, m.end()) if not any(c.isdigit() for c in model) else None
+        out["modele"] = f"{model} {g.group(1)}" if g else model
+    else:
+        m = RE_MODEL_CLIO.search(text)
+        if m:
+            out["modele"] = f"Clio {m.group(1)}"
+            out["marque"] = "Renault"
+
+    m = RE_BRAND.search(text)
+    if m:
+        out["marque"] = _BRANDS_LOWER[m.group(1).lower()]
+
+    year = parse_year(text)
+    if year:
+        out["annee"] = year
+
+    return out
@@ -0,0 +1,97 @@
+# stock_delta.py
+"""
+Mise à jour incrémentale du stock par deltas (au lieu de réécrire tout le CSV à la main).
+
+Un delta par ligne (NDJSON), clé = piece + marque + modele + annee :
+
+    {"op": "upsert", "piece": "Turbo", "marque": "Renault", "modele": "Clio 4", "annee": 2017, "stock": 3}
+    {"op": "delete", "piece": "Turbo", "marque": "Renault", "modele": "Clio 4", "annee": 2017}
+
+Un upsert partiel ne change que les champs fournis (ex: seulement "stock") ;
+une nouvelle pièce doit avoir prix et stock (nombres >= 0).
+Chaque lot est appliqué d'un bloc : nouvelle version du catalogue en mémoire
++ lot ajouté au journal data/stock.csv.deltas, que les autres workers relisent
+depuis leur dernier offset (pas de relecture du CSV). Le journal est fusionné
+dans stock.csv au-delà de config.stock_delta_compact_bytes, ou avec --compact.
+
+    python stock_delta.py deltas.ndjson [--batch 5000]
+    cat deltas.ndjson | python stock_delta.py -
+    python stock_delta.py --compact
+    POST /admin/stock/delta  (liste JSON ou NDJSON, accès admin)
+"""
+import argparse
+import json
+import sys
+from typing import Iterable, Iterator, List
+
+from pieces import CATALOG
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[dict]:
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            d = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"ligne {n}: JSON invalide ({e.msg})")
+        if not isinstance(d, dict):
+            raise ValueError(f"ligne {n}: objet JSON attendu")
+        yield d
+
+
+def apply_stream(deltas: Iterable[dict], batch_size: int = 5000) -> dict:
+    """Applique par lots ; un lot invalide est rejeté en entier (ValueError)."""
+    total = {"batches": 0, "upserts": 0, "deletes": 0, "version": CATALOG.snapshot().version}
+    batch: List[dict] = []
+
+    def flush() -> None:
+        res = CATALOG.apply_deltas(batch)
+        total["batches"] += 1
+        total["upserts"] += res["upserts"]
+        total["deletes"] += res["deletes"]
+        total["version"] = res["version"]
+        total["rows"] = res["rows"]
+        batch.clear()
+
+    for d in deltas:
+        batch.append(d)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return total
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Applique un flux de deltas au stock.")
+    p.add_argument("path", nargs="?", help="fichier NDJSON, ou - pour l'entrée standard")
+    p.add_argument("--batch", type=int, default=5000, help="deltas par lot atomique")
+    p.add_argument("--compact", action="store_true", help="fusionne le journal dans stock.csv")
+    args = p.parse_args(argv)
+
+    if args.compact and not args.path:
+        CATALOG.compact()
+        print("journal fusionné dans stock.csv")
+        return 0
+    if not args.path:
+        p.error("chemin NDJSON requis (ou --compact)")
+
+    f = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    try:
+        res = apply_stream(parse_ndjson(f), batch_size=max(1, args.batch))
+    except ValueError as e:
+        print("delta refusé:", e)
+        return 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if args.compact:
+        CATALOG.compact()
+    print(json.dumps(res, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
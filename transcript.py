@@ -0,0 +1,224 @@
+# transcript.py
+"""
+Journal des conversations (transcripts), sans I/O sur le chemin chaud.
+
+- TurnTrace : collecte pendant un tour les timings par étape (parse, file LLM,
+  LLM, lookup stock, save_lead...) et les prompts / sorties du modèle ;
+- TranscriptLogger : /chat pousse un enregistrement dans une file bornée,
+  un thread de fond écrit des lots NDJSON dans data/transcripts/ ;
+  file pleine => l'enregistrement est abandonné (compteur "dropped").
+
+Relecture : python replay.py (voir replay.py).
+"""
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+import config
+
+# ---------- TRACE D'UN TOUR ----------
+
+_current: contextvars.ContextVar = contextvars.ContextVar("turn_trace", default=None)
+
+
+class TurnTrace:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.timings: dict = {}
+        self.llm: List[dict] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(name, time.perf_counter() - t0)
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = round(self.timings.get(name, 0.0) + seconds * 1000, 2)
+
+    def add_llm(self, messages: list, output: str, wait_sec: float, run_sec: float, fallback: bool) -> None:
+        self.llm.append({
+            "prompt": messages,
+            "output": output,
+            "fallback": fallback,
+            "wait_ms": round(wait_sec * 1000, 2),
+            "run_ms": round(run_sec * 1000, 2),
+        })
+        self.add_timing("llm_queue", wait_sec)
+        self.add_timing("llm", run_sec)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+
+def current() -> Optional[TurnTrace]:
+    return _current.get()
+
+
+def stage(name: str):
+    """Mesure une étape si un tour est tracé (sinon ne fait rien)."""
+    tr = _current.get()
+    return tr.stage(name) if tr is not None else nullcontext()
+
+
+@contextmanager
+def tracing() -> Iterator[TurnTrace]:
+    tr = TurnTrace()
+    token = _current.set(tr)
+    try:
+        yield tr
+    finally:
+        _current.reset(token)
+
+
+# ---------- ÉCRITURE ASYNCHRONE ----------
+
+class TranscriptLogger:
+    def __init__(
+        self,
+        directory: str,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        flush_interval_sec: float = 1.0,
+        segment_max_bytes: int = 5_000_000,
+    ) -> None:
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.segment_max_bytes = segment_max_bytes
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._segment: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # compteurs touchés par les threads requête et l'écrivain
+        self.written = 0
+        self.dropped = 0
+        self.segments = 0
+
+    def log(self, record: dict) -> bool:
+        """Non bloquant. Renvoie False si l'enregistrement est abandonné."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def configure(self, directory: str, max_queue: int, segment_max_bytes: int) -> None:
+        """Rechargement de config : nouveau dossier => nouveau segment au prochain lot."""
+        with self._queue.mutex:
+            self._queue.maxsize = max_queue  # la file garde ce qui est déjà en attente
+        self.segment_max_bytes = segment_max_bytes
+        if directory != self.directory:
+            self.directory = directory
+            self._segment = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+                self._thread.start()
+
+    def _segment_path(self) -> str:
+        if self._segment is None or (
+            os.path.exists(self._segment) and os.path.getsize(self._segment) >= self.segment_max_bytes
+        ):
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"transcripts-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}.ndjson"
+            self._segment = os.path.join(self.directory, name)
+            self.segments += 1
+        return self._segment
+
+    def _write(self, batch: List[dict]) -> None:
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+        with open(self._segment_path(), "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.written += len(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval_sec
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError as e:
+                with self._stats_lock:
+                    self.dropped += len(batch)
+                print("transcript:", e, file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Attend l'écriture de tout ce qui est en file (tests / arrêt)."""
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "segments": self.segments,
+        }
+
+
+_logger: Optional[TranscriptLogger] = None
+_lock = threading.Lock()
+
+
+def _on_reload(cfg: config.Config) -> None:
+    with _lock:
+        _logger.configure(cfg.transcripts_dir, cfg.transcripts_max_queue, cfg.transcripts_segment_max_bytes)
+
+
+def get_logger() -> TranscriptLogger:
+    global _logger
+    with _lock:
+        if _logger is None:
+            cfg = config.get()
+            _logger = TranscriptLogger(
+                cfg.transcripts_dir,
+                max_queue=cfg.transcripts_max_queue,
+                segment_max_bytes=cfg.transcripts_segment_max_bytes,
+            )
+            config.on_reload(_on_reload)
+        return _logger
+
+
+# ---------- LECTURE ----------
+
+def read_records(paths: Iterable[str]) -> Iterator[dict]:
+    """Lit des fichiers .ndjson (ou tous ceux d'un dossier)."""
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, n) for n in os.listdir(path) if n.endswith(".ndjson"))
+        else:
+            files = [path]
+        for fp in files:
+            with open(fp, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
@@ -1,11 +1,24 @@
 # ui_gui.py
+import threading
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
 
-from assistant import new_state, process_user_input
+# assistant (moteur, catalogue, client HTTP) est chargé APRÈS l'affichage de la fenêtre
 
 
-def launch_app():
+def _load_assistant():
+    import assistant
+    return assistant
+
+
+def _warmup():
+    # tâche de fond : imports + catalogue + pool HTTP, pendant que la fenêtre est déjà là
+    _load_assistant()
+    import engine
+    engine.warmup()
+
+
+def build_window() -> tk.Tk:
     root = tk.Tk()
     root.title("AutoTurbo IA - GUI (Texte)")
     root.geometry("780x540")
@@ -30,8 +43,8 @@ def launch_app():
     btn_send = tk.Button(bottom, text="Envoyer", font=("Segoe UI", 11))
     btn_send.pack(side=tk.LEFT, padx=(10, 0))
 
-    # --- Mémoire conversationnelle ---
-    state = new_state()
+    # --- Mémoire conversationnelle (créée au premier message) ---
+    state = None
 
     def ui_write(line: str):
         chat.configure(state="normal")
@@ -52,7 +65,10 @@ def launch_app():
         ui_write("IA > ...")
         root.update_idletasks()
 
-        answer, state = process_user_input(text, state)
+        assistant = _load_assistant()  # déjà chargé par _warmup dans la plupart des cas
+        if state is None:
+            state = assistant.new_state()
+        answer, state = assistant.process_user_input(text, state)
 
         if answer:
             ui_write(f"IA > {answer}\n")
@@ -63,4 +79,11 @@ def launch_app():
     entry.bind("<Return>", lambda e: send())
     entry.focus()
 
+    return root
+
+
+def launch_app():
+    root = build_window()
+    # la fenêtre s'affiche d'abord, le moteur se charge ensuite en arrière-plan
+    root.after(0, lambda: threading.Thread(target=_warmup, name="gui-warmup", daemon=True).start())
     root.mainloop()
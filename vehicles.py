@@ -0,0 +1,156 @@
+# vehicles.py
+"""
+Registre local des véhicules : immatriculation / VIN -> marque, modèle, année.
+
+- table (optionnelle) : config.vehicles_csv, colonnes immat_ou_vin,marque,modele,annee ;
+  dict en mémoire (recherche O(1)), rechargé seulement si le fichier change (mtime) ;
+- décodage du VIN si absent de la table :
+  * WMI (3 premiers caractères) -> marque ;
+  * 10e caractère -> année modèle (cycle de 30 ans, voir decode_year), seulement
+    pour les VIN qui l'encodent à coup sûr : Amérique du Nord (obligatoire) et
+    constructeurs de YEAR_WMIS. En Europe ce code est facultatif (Renault, PSA,
+    Dacia... y mettent autre chose) : l'année reste alors demandée au client.
+  Le modèle ne se déduit pas du VIN (propre à chaque constructeur).
+
+Aucun appel réseau, aucun LLM.
+"""
+import csv
+import os
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import config
+
+# WMI -> marque (orthographe de slot_parser.KNOWN_BRANDS)
+WMI_BRANDS = {
+    "VF1": "Renault", "VF2": "Renault", "VF8": "Renault",
+    "UU1": "Dacia", "UU3": "Dacia",
+    "VF3": "Peugeot", "VR3": "Peugeot",
+    "VF7": "Citroen", "VR7": "Citroen",
+    "WVW": "Volkswagen", "WV1": "Volkswagen", "WV2": "Volkswagen", "WVG": "Volkswagen", "3VW": "Volkswagen",
+    "JTD": "Toyota", "JTE": "Toyota", "JTN": "Toyota", "SB1": "Toyota", "VNK": "Toyota", "NMT": "Toyota",
+    "MR0": "Toyota", "AHT": "Toyota",
+    "WF0": "Ford", "VS6": "Ford", "1FA": "Ford",
+    "KMH": "Hyundai", "TMA": "Hyundai", "NLH": "Hyundai", "MAL": "Hyundai",
+    "KNA": "Kia", "KNE": "Kia", "U5Y": "Kia", "U6Y": "Kia",
+    "WBA": "BMW", "WBS": "BMW", "WBY": "BMW",
+    "WDB": "Mercedes", "WDD": "Mercedes", "WDC": "Mercedes", "W1K": "Mercedes", "W1N": "Mercedes",
+    "ZFA": "Fiat", "ZFC": "Fiat", "NM4": "Fiat",
+    "SJN": "Nissan", "VSK": "Nissan", "JN1": "Nissan", "VWA": "Nissan",
+    "W0L": "Opel", "W0V": "Opel",
+    "WAU": "Audi", "WUA": "Audi", "TRU": "Audi",
+    "TMB": "Skoda",
+    "VSS": "Seat",
+}
+
+# WMI hors Amérique du Nord dont le 10e caractère est toujours l'année modèle
+YEAR_WMIS = {
+    "WVW", "WV1", "WV2", "WVG", "WAU", "WUA", "TRU", "TMB", "VSS",  # groupe VW
+    "KMH", "KNA", "KNE",                                            # Hyundai / Kia (Corée)
+}
+
+# 10e caractère du VIN -> année (cycle 1980-2009, puis 2010-2039)
+_YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+YEAR_CODE_BASE = {c: 1980 + i for i, c in enumerate(_YEAR_CODES)}
+
+FIELDS = ["immat_ou_vin", "marque", "modele", "annee"]
+
+
+def normalize(plate_or_vin: str) -> str:
+    """'12345-A-6' -> '12345A6', 'ab-123-cd' -> 'AB123CD' (clé de la table)."""
+    return "".join(c for c in str(plate_or_vin).upper() if c.isalnum())
+
+
+def encodes_year(vin: str) -> bool:
+    return len(vin) == 17 and (vin[0] in "12345" or vin[:3] in YEAR_WMIS)
+
+
+def decode_year(vin: str, today: Optional[date] = None) -> Optional[int]:
+    """
+    Année modèle du 10e caractère (à n'utiliser que si encodes_year). Le code se répète tous les 30 ans :
+    VIN nord-américain (1er caractère 1-5) => 7e caractère chiffre = 1980-2009,
+    lettre = 2010-2039 ; ailleurs => l'année la plus récente pas dans le futur.
+    """
+    if len(vin) != 17:
+        return None
+    base = YEAR_CODE_BASE.get(vin[9])
+    if base is None:
+        return None
+    if vin[0] in "12345":
+        return base + 30 if vin[6].isalpha() else base
+    latest = (today or date.today()).year + 1
+    return base + 30 if base + 30 <= latest else base
+
+
+def decode_vin(vin: str) -> Dict[str, object]:
+    vin = normalize(vin)
+    out: Dict[str, object] = {}
+    if len(vin) != 17:
+        return out
+    brand = WMI_BRANDS.get(vin[:3])
+    if brand:
+        out["marque"] = brand
+        year = decode_year(vin) if encodes_year(vin) else None
+        if year:
+            out["annee"] = year
+    return out
+
+
+class VehicleRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._table: Dict[str, dict] = {}
+        self._path: Optional[str] = None
+        self._mtime: float = -1.0
+        self.hits = {"table": 0, "vin": 0, "miss": 0}
+
+    def table(self) -> Dict[str, dict]:
+        path = config.get().vehicles_csv
+        mtime = os.path.getmtime(path) if os.path.exists(path) else -1.0
+        if path != self._path or mtime != self._mtime:
+            with self._lock:
+                if path != self._path or mtime != self._mtime:
+                    self._table = self._read(path) if mtime >= 0 else {}
+                    self._path, self._mtime = path, mtime
+        return self._table
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, dict]:
+        table: Dict[str, dict] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                key = normalize(row.get("immat_ou_vin") or "")
+                if not key:
+                    continue
+                v: Dict[str, object] = {k: row[k].strip() for k in ("marque", "modele") if (row.get(k) or "").strip()}
+                if (row.get("annee") or "").strip().isdigit():
+                    v["annee"] = int(row["annee"])
+                table[key] = v
+        return table
+
+    def lookup(self, immat: Optional[str] = None, vin: Optional[str] = None) -> Tuple[Dict[str, object], Optional[str]]:
+        """
+        ({marque, modele, annee} connus, source) : source "table" (fiche du registre,
+        fiable), "vin" (décodage partiel) ou None (véhicule inconnu, dict vide).
+        """
+        table = self.table()
+        for ident in (vin, immat):
+            if ident and ident != "UNKNOWN":
+                hit = table.get(normalize(ident))
+                if hit:
+                    self.hits["table"] += 1
+                    return dict(hit), "table"
+        decoded = decode_vin(vin) if vin and vin != "UNKNOWN" else {}
+        self.hits["vin" if decoded else "miss"] += 1
+        return decoded, ("vin" if decoded else None)
+
+    def stats(self) -> dict:
+        return {"table_rows": len(self._table), **self.hits}
+
+
+REGISTRY = VehicleRegistry()
+
+
+def lookup(immat: Optional[str] = None, vin: Optional[str] = None) -> Tuple[Dict[str, object], Optional[str]]:
+    return REGISTRY.lookup(immat, vin)